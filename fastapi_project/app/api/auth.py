@@ -9,6 +9,7 @@ from app.crud.crud import user_crud
 from app.db.database import get_db
 from app.schemas import schemas
 from app.models.user import User
+from app.core.principal_cache import Principal, get_principal, cache_principal
 
 
 # Router
@@ -53,10 +54,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     except JWTError:
         raise credentials_exception
 
-    user = await user_crud.get_user_by_email(db, email=email)
-    if user is None:
-        raise credentials_exception
-    return user
+    # Cache court par sujet du token : pas de requête SQL pour la plupart des appels
+    principal = get_principal(email)
+    if principal is None:
+        user = await user_crud.get_user_by_email(db, email=email)
+        if user is None:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+        cache_principal(email, principal)
+    return principal
 
 
 # Register
@@ -0,0 +1,227 @@
+import os
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from app.chatbot.text import normalize_text
+from app.chatbot.vector_index import EMBEDDING_DIM, embed, has_custom_embedding
+from app.core.cache import TTLCache, caches
+
+# Cache des réponses du chatbot, en deux niveaux :
+#   exact     : même question normalisée, même portée (cours, modèle, variante de prompt)
+#   sémantique: question la plus proche de la même portée, cosinus >= ANSWER_CACHE_SIMILARITY
+# Une portée est un tuple (course_id | None, modèle, variante) ; tout ce qui change la réponse y figure.
+#
+# Le niveau sémantique n'est sûr qu'avec un vrai modèle de phrases (set_embedding_function) :
+# un sac de mots confond « celsius en fahrenheit » et « fahrenheit en celsius ».
+# ANSWER_CACHE_SEMANTIC=auto (défaut) : actif seulement si un modèle est enregistré ;
+# 1 : actif quand même, avec un hachage des mots ET des paires de mots consécutifs (ordre et
+# négations comptent) ; 0 : niveau exact seul.
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2048"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+ANSWER_CACHE_SEMANTIC = os.getenv("ANSWER_CACHE_SEMANTIC", "auto")  # auto | 1 | 0
+
+Scope = tuple[int | None, str, str]
+
+
+def normalize_question(question: str) -> str:
+    """'Explique les Réseaux neuronaux ?' -> 'explique les reseaux neuronaux'"""
+    return normalize_text(question)
+
+
+def semantic_enabled() -> bool:
+    if ANSWER_CACHE_SEMANTIC == "auto":
+        return has_custom_embedding()
+    return ANSWER_CACHE_SEMANTIC == "1"
+
+
+def ordered_hashing_embedding(text: str) -> np.ndarray:
+    """
+    Repli sans modèle : hachage des mots et des bigrammes d'une question normalisée, sans
+    retirer les mots vides (« pas », « n' », « en » changent le sens d'une question).
+    """
+    words = text.split()
+    out = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        h = zlib.crc32(feature.encode("utf-8"))
+        out[h % EMBEDDING_DIM] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(out)
+    return out / norm if norm else out
+
+
+def question_vector(text: str) -> np.ndarray:
+    if has_custom_embedding():
+        return embed([text])[0]
+    return ordered_hashing_embedding(text)
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    scope: Scope
+    text: str
+    vector: np.ndarray | None = None
+
+
+class SemanticCache:
+    """
+    Réponses indexées par l'embedding de la question, regroupées par portée.
+    LRU borné sur l'ensemble des portées, avec TTL. La matrice des vecteurs d'une portée
+    est reconstruite paresseusement après chaque modification de cette portée.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, threshold: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._order: OrderedDict[tuple[Scope, str], None] = OrderedDict()
+        self._scopes: dict[Scope, dict[str, tuple[float, np.ndarray, str]]] = {}
+        self._matrices: dict[Scope, tuple[list[str], np.ndarray]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        caches[name] = self
+
+    def _remove(self, scope: Scope, text: str):
+        self._order.pop((scope, text), None)
+        entries = self._scopes.get(scope)
+        if entries is not None:
+            entries.pop(text, None)
+            if not entries:
+                del self._scopes[scope]
+        self._matrices.pop(scope, None)
+
+    def _matrix(self, scope: Scope) -> tuple[list[str], np.ndarray]:
+        matrix = self._matrices.get(scope)
+        if matrix is None:
+            entries = self._scopes[scope]
+            texts = list(entries)
+            matrix = self._matrices[scope] = (texts, np.stack([entries[t][1] for t in texts]))
+        return matrix
+
+    def get(self, scope: Scope, vector: np.ndarray) -> str | None:
+        if scope not in self._scopes:
+            self.misses += 1
+            return None
+
+        texts, matrix = self._matrix(scope)
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        text = texts[best]
+        expires_at, _, answer = self._scopes[scope][text]
+        if expires_at < time.monotonic():
+            self._remove(scope, text)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._order.move_to_end((scope, text))
+        self.hits += 1
+        return answer
+
+    def set(self, scope: Scope, text: str, vector: np.ndarray, answer: str):
+        self._scopes.setdefault(scope, {})[text] = (time.monotonic() + self.ttl, vector, answer)
+        self._order[(scope, text)] = None
+        self._order.move_to_end((scope, text))
+        self._matrices.pop(scope, None)
+        while len(self._order) > self.maxsize:
+            old_scope, old_text = next(iter(self._order))
+            self._remove(old_scope, old_text)
+            self.evictions += 1
+
+    def invalidate_where(self, predicate: Callable[[Scope], bool]):
+        for scope in [s for s in self._scopes if predicate(s)]:
+            for text in list(self._scopes[scope]):
+                self._remove(scope, text)
+
+    def clear(self):
+        self._order.clear()
+        self._scopes.clear()
+        self._matrices.clear()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._order),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "threshold": self.threshold,
+            "scopes": len(self._scopes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class AnswerCache:
+    """
+    Niveau exact puis niveau sémantique (si semantic_enabled()) ; l'embedding n'est calculé
+    qu'en cas d'échec du premier.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = ANSWER_CACHE_SIZE,
+        ttl: float = ANSWER_CACHE_TTL,
+        threshold: float = ANSWER_CACHE_SIMILARITY,
+        enabled: bool = ANSWER_CACHE_ENABLED,
+    ):
+        self.enabled = enabled
+        self.exact = TTLCache("answers_exact", maxsize=maxsize, ttl=ttl)
+        self.semantic = SemanticCache("answers_semantic", maxsize=maxsize, ttl=ttl, threshold=threshold)
+
+    async def lookup(self, scope: Scope, question: str) -> tuple[str | None, AnswerKey]:
+        """Renvoie (réponse ou None, clé à passer à store())."""
+        text = normalize_question(question)
+        if not self.enabled or not text:
+            return None, AnswerKey(scope, text)
+
+        answer = self.exact.get((scope, text))
+        if answer is not None:
+            return answer, AnswerKey(scope, text)
+
+        if not semantic_enabled():
+            return None, AnswerKey(scope, text)
+
+        vector = await run_in_threadpool(question_vector, text)
+        key = AnswerKey(scope, text, vector)
+        if not vector.any():
+            return None, key  # que des mots vides inconnus : pas de voisinage fiable
+        return self.semantic.get(scope, vector), key
+
+    def store(self, key: AnswerKey, answer: str):
+        if not self.enabled or not key.text or not answer:
+            return
+        self.exact.set((key.scope, key.text), answer)
+        if key.vector is not None and key.vector.any():
+            self.semantic.set(key.scope, key.text, key.vector, answer)
+
+    def invalidate_course(self, course_id: int):
+        self.exact.invalidate_where(lambda key, _: key[0][0] == course_id)
+        self.semantic.invalidate_where(lambda scope: scope[0] == course_id)
+
+
+answer_cache = AnswerCache()
+
+
+def invalidate_course_answers(course_id: int):
+    """A appeler dès que les PDF d'un cours changent (ajout, suppression, cours supprimé)."""
+    answer_cache.invalidate_course(course_id)
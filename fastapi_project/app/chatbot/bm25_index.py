@@ -0,0 +1,106 @@
+import math
+import os
+import threading
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from app.chatbot.text import tokenize_fr
+from app.core.cache import TTLCache
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class BM25Index:
+    """
+    Index inversé BM25 des morceaux de PDF d'un cours.
+    Postings compacts : terme -> (array 'i' des positions de document, array 'H' des fréquences).
+    Les positions croissent à chaque ajout, les listes restent donc triées.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, tuple[array, array]] = {}
+        self.chunk_ids = array("q")
+        self.doc_lens = array("I")
+        self.total_len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    def add(self, chunk_ids: list[int], texts: list[str]):
+        tokenized = [Counter(tokenize_fr(text)) for text in texts]
+
+        with self._lock:
+            for chunk_id, counts in zip(chunk_ids, tokenized):
+                position = len(self.chunk_ids)
+                self.chunk_ids.append(chunk_id)
+                length = sum(counts.values())
+                self.doc_lens.append(length)
+                self.total_len += length
+
+                for term, tf in counts.items():
+                    entry = self.postings.get(term)
+                    if entry is None:
+                        entry = self.postings[term] = (array("i"), array("H"))
+                    entry[0].append(position)
+                    entry[1].append(min(tf, 65535))
+
+    def search(self, query: str, k: int = 5) -> list[tuple[int, float]]:
+        terms = set(tokenize_fr(query))
+
+        with self._lock:
+            n = len(self.chunk_ids)
+            if n == 0 or not terms:
+                return []
+
+            avgdl = self.total_len / n or 1.0
+            doc_lens = np.frombuffer(self.doc_lens, dtype=np.uint32)
+            scores = np.zeros(n, dtype=np.float32)
+
+            for term in terms:
+                entry = self.postings.get(term)
+                if entry is None:
+                    continue
+                positions = np.frombuffer(entry[0], dtype=np.int32)
+                tf = np.frombuffer(entry[1], dtype=np.uint16).astype(np.float32)
+                df = len(positions)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * doc_lens[positions] / avgdl)
+                scores[positions] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            matched = np.flatnonzero(scores)
+            if len(matched) > k:
+                matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+            matched = matched[np.argsort(-scores[matched])]
+
+            return [(int(self.chunk_ids[i]), float(scores[i])) for i in matched]
+
+    def memory_bytes(self) -> int:
+        postings = sum(
+            p.buffer_info()[1] * p.itemsize + f.buffer_info()[1] * f.itemsize
+            for p, f in self.postings.values()
+        )
+        return postings + len(self.chunk_ids) * 8 + len(self.doc_lens) * 4
+
+
+# Index BM25 par cours, construits à la demande depuis pdf_chunks : course_id -> (version, index)
+bm25_indexes = TTLCache(
+    "bm25_indexes",
+    maxsize=int(os.getenv("BM25_CACHE_SIZE", "64")),
+    ttl=float(os.getenv("BM25_CACHE_TTL", "3600")),
+)
+
+
+def build_bm25_index(rows: list[tuple[int, str]]) -> BM25Index:
+    index = BM25Index()
+    index.add([chunk_id for chunk_id, _ in rows], [text for _, text in rows])
+    return index
+
+
+def invalidate_bm25(course_id: int):
+    bm25_indexes.invalidate(course_id)
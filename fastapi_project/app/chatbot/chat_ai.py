@@ -1,7 +1,31 @@
-from langchain_community.llms import Ollama
+import os
+import threading
+from typing import Iterator
+
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3:latest")
+
+# LLM simple, construit au premier usage : l'import de langchain coûte à lui seul
+# plus que le reste de l'application au démarrage.
+llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    global llm
+    if llm is None:
+        with _llm_lock:
+            if llm is None:
+                from langchain_community.llms import Ollama
+                llm = Ollama(model=OLLAMA_MODEL)
+    return llm
+
+
+def warm_up():
+    """
+    Construit le client et fait charger le modèle par Ollama (génération d'un seul token).
+    """
+    get_llm().predict("Bonjour", num_predict=1)
 
-# LLM simple
-llm = Ollama(model="llama3:latest")
 
 def simple_chat(question: str) -> str:
     """
@@ -9,5 +33,60 @@ def simple_chat(question: str) -> str:
     Pas de mémoire, pas de profil utilisateur.
     """
     # Appel direct à Ollama
-    response = llm.predict(question)
+    response = get_llm().predict(question)
     return response
+
+
+def answer_scope(course_id: int | None, variant: str) -> tuple:
+    """
+    Portée du cache de réponses : tout ce qui, hors question, change la réponse
+    (cours, modèle, type de prompt / niveau de l'étudiant).
+    """
+    return (course_id, OLLAMA_MODEL, variant)
+
+
+def prompt_key(prompt: str) -> tuple:
+    """Clé de coalescence des générations en cours : même modèle, même prompt."""
+    return (OLLAMA_MODEL, prompt)
+
+
+def user_prompt(level: str, question: str) -> str:
+    level = getattr(level, "value", level)
+    return (
+        f"Tu es un tuteur pédagogique. Le niveau de l'étudiant est : {level}.\n"
+        f"Réponds de façon adaptée à ce niveau.\n\nQuestion : {question}"
+    )
+
+
+def context_prompt(question: str, passages: list[str]) -> str:
+    context = "\n\n---\n\n".join(passages)
+    return (
+        "Tu es un tuteur pédagogique. Réponds à la question en t'appuyant uniquement "
+        "sur les extraits du cours ci-dessous. Si la réponse n'y figure pas, dis-le.\n\n"
+        f"Extraits du cours :\n{context}\n\nQuestion : {question}"
+    )
+
+
+def chat_with_user(level: str, question: str) -> str:
+    """
+    Chatbot pédagogique : adapte la réponse au niveau de l'étudiant.
+    """
+    return get_llm().predict(user_prompt(level, question))
+
+
+def chat_with_context(question: str, passages: list[str]) -> str:
+    """
+    Chatbot sur les PDF d'un cours : répond à partir des passages retrouvés.
+    """
+    return get_llm().predict(context_prompt(question, passages))
+
+
+def complete_prompt(prompt: str) -> str:
+    return get_llm().predict(prompt)
+
+
+def stream_prompt(prompt: str) -> Iterator[str]:
+    """
+    Génération token par token (itérateur synchrone, à consommer hors de la boucle asyncio).
+    """
+    return get_llm().stream(prompt)
@@ -0,0 +1,198 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+
+
+class LLMSaturatedError(Exception):
+    """File d'attente du LLM pleine ou attente trop longue : la requête est refusée."""
+
+
+def _percentile_ms(values: deque, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000, 3)
+
+
+class LLMStream:
+    """
+    Génération en streaming qui occupe une place de l'exécuteur.
+    L'itérateur synchrone est consommé dans le pool ; chaque token est relayé à la boucle.
+    Si le client part (itération annulée), la production s'arrête au token suivant.
+    """
+
+    _DONE = object()
+
+    def __init__(self, executor: "LLMExecutor", fn: Callable[..., Iterator[str]], args, kwargs, started_at: float):
+        self._executor = executor
+        self._fn = functools.partial(fn, *args, **kwargs)
+        self._started_at = started_at
+        self._iterated = False
+        self._released = False
+
+    def _release(self, *_):
+        if not self._released:
+            self._released = True
+            self._executor.release()
+
+    def release_if_unused(self):
+        """A appeler après la réponse : libère la place si le flux n'a jamais été lu."""
+        if not self._iterated:
+            self._release()
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[str]:
+        self._iterated = True
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def push(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                stop.set()  # boucle fermée
+
+        def produce():
+            try:
+                for token in self._fn():
+                    if stop.is_set():
+                        break
+                    push(token)
+            except Exception as e:
+                push(e)
+            finally:
+                push(self._DONE)
+
+        future = loop.run_in_executor(self._executor._executor, produce)
+        # La place n'est rendue qu'une fois le thread producteur terminé
+        future.add_done_callback(self._release)
+
+        first_token_at = None
+        try:
+            while True:
+                item = await queue.get()
+                if item is self._DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    self._executor.first_token_times.append(first_token_at - self._started_at)
+                yield item
+        except Exception:
+            self._executor.failed += 1
+            raise
+        else:
+            self._executor.completed += 1
+            self._executor.total_times.append(time.perf_counter() - self._started_at)
+        finally:
+            stop.set()
+
+
+class LLMExecutor:
+    """
+    Exécute les appels LLM synchrones dans un pool de threads dédié, hors de la boucle asyncio.
+    Au plus max_concurrency générations en parallèle, au plus max_queue requêtes en attente ;
+    au-delà, ou après queue_timeout secondes d'attente, LLMSaturatedError.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waits: deque[float] = deque(maxlen=1000)
+        self.first_token_times: deque[float] = deque(maxlen=1000)
+        self.total_times: deque[float] = deque(maxlen=1000)
+
+    async def acquire(self):
+        # Compteurs mis à jour sans await : cohérents même si le sémaphore n'est pas encore pris
+        if self.waiting + self.running >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise LLMSaturatedError("LLM queue is full")
+
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise LLMSaturatedError("Timed out waiting for the LLM")
+        finally:
+            self.waiting -= 1
+
+        self._waits.append(time.perf_counter() - start)
+        self.running += 1
+
+    def release(self):
+        self.running -= 1
+        self._semaphore.release()
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        started_at = time.perf_counter()
+        await self.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.release()
+        self.completed += 1
+        self.total_times.append(time.perf_counter() - started_at)
+        return result
+
+    async def stream(self, fn: Callable[..., Iterator[str]], *args, **kwargs) -> LLMStream:
+        """
+        Réserve une place (LLMSaturatedError avant tout envoi de réponse)
+        puis renvoie le flux de tokens de fn(*args, **kwargs).
+        """
+        started_at = time.perf_counter()
+        await self.acquire()
+        return LLMStream(self, fn, args, kwargs, started_at)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queue_depth": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_p50_ms": _percentile_ms(self._waits, 50),
+            "wait_p99_ms": _percentile_ms(self._waits, 99),
+            "first_token_p50_ms": _percentile_ms(self.first_token_times, 50),
+            "first_token_p99_ms": _percentile_ms(self.first_token_times, 99),
+            "total_p50_ms": _percentile_ms(self.total_times, 50),
+            "total_p99_ms": _percentile_ms(self.total_times, 99),
+        }
+
+
+llm_executor = LLMExecutor()
@@ -1,19 +1,109 @@
+import os
+
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from app.chatbot.chat_ai import chat_with_user
-from app.chatbot.pdf_rag import chat_with_pdf
+from app.chatbot.chat_ai import (
+    answer_scope, complete_prompt, context_prompt, prompt_key, stream_prompt, user_prompt,
+)
+from app.chatbot.answer_cache import answer_cache
+from app.chatbot.bm25_index import BM25Index, bm25_indexes, build_bm25_index
+from app.chatbot.vector_index import search_course, rerank_course
+from app.chatbot.llm_executor import llm_executor, LLMSaturatedError
+from app.chatbot.streaming import sse_response, sse_cached_response
+from app.chatbot.single_flight import llm_flights
 from app.db.database import get_db
 from app.api.auth import get_current_user
+from app.models.pdf import PDFChunk
 
 router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
 
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+RAG_MODE = os.getenv("RAG_MODE", "hybrid")  # bm25 | dense | hybrid
+RAG_CANDIDATES = int(os.getenv("RAG_CANDIDATES", "50"))
+
 # Requête envoyée par l'étudiant
 class ChatRequest(BaseModel):
     question: str
     course_id: int | None = None  # facultatif, si tu veux utiliser le PDF RAG
 
+
+async def get_bm25_index(db: AsyncSession, course_id: int) -> BM25Index:
+    """
+    Index BM25 du cours, reconstruit quand ses morceaux ont changé. Version vérifiée à chaque
+    appel (nombre et plus grand id des morceaux, lus sur l'index pdf_chunks.course_id) :
+    un envoi ou une suppression traité par un autre worker est vu sans attendre le TTL.
+    """
+    version = tuple((await db.execute(
+        select(func.count(PDFChunk.id), func.max(PDFChunk.id)).where(PDFChunk.course_id == course_id)
+    )).one())
+
+    cached = bm25_indexes.get(course_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    rows = (await db.execute(
+        select(PDFChunk.id, PDFChunk.text)
+        .where(PDFChunk.course_id == course_id)
+        .order_by(PDFChunk.id)
+    )).all()
+    index = await run_in_threadpool(build_bm25_index, [tuple(row) for row in rows])
+    bm25_indexes.set(course_id, (version, index))
+    return index
+
+
+async def retrieve_chunks(db: AsyncSession, course_id: int, question: str, k: int = RAG_TOP_K) -> list[PDFChunk]:
+    """
+    Passages les plus proches de la question, dans l'ordre du score.
+    bm25 : lexical seul ; dense : index vectoriel seul ;
+    hybrid : BM25 propose RAG_CANDIDATES candidats, re-classés par l'index vectoriel.
+    """
+    if RAG_MODE == "dense":
+        hits = await run_in_threadpool(search_course, course_id, question, k)
+    else:
+        bm25 = await get_bm25_index(db, course_id)
+        candidates = await run_in_threadpool(bm25.search, question, k if RAG_MODE == "bm25" else RAG_CANDIDATES)
+        if RAG_MODE == "bm25":
+            hits = candidates
+        elif candidates:
+            hits = await run_in_threadpool(rerank_course, course_id, question, [c for c, _ in candidates], k) or candidates[:k]
+        else:
+            # aucun mot en commun : recherche vectorielle seule
+            hits = await run_in_threadpool(search_course, course_id, question, k)
+
+    if not hits:
+        return []
+
+    result = await db.execute(
+        select(PDFChunk).where(PDFChunk.id.in_([chunk_id for chunk_id, _ in hits]))
+    )
+    chunks = {chunk.id: chunk for chunk in result.scalars().all()}
+    return [chunks[chunk_id] for chunk_id, _ in hits if chunk_id in chunks]
+
+
+async def build_prompt(db: AsyncSession, request: ChatRequest, current_user) -> str:
+    """
+    Prompt envoyé au LLM. Avec course_id : passages retrouvés dans les PDF du cours (404 s'il n'y en a pas) ;
+    sinon chat général selon le niveau de l'étudiant.
+    """
+    if request.course_id:
+        chunks = await retrieve_chunks(db, request.course_id, request.question)
+        if not chunks:
+            raise HTTPException(status_code=404, detail="No indexed content for this course")
+        return context_prompt(request.question, [chunk.text for chunk in chunks])
+    return user_prompt(current_user.level, request.question)
+
+
+def ask_scope(request: ChatRequest, current_user) -> tuple:
+    # Réponses sur les PDF partagées par cours ; chat général partagé par niveau
+    if request.course_id:
+        return answer_scope(request.course_id, "pdf")
+    return answer_scope(None, f"level:{getattr(current_user.level, 'value', current_user.level)}")
+
+
 @router.post("/ask")
 async def chat(
     request: ChatRequest,
@@ -25,25 +115,56 @@ async def chat(
     Si course_id est fourni, utilise le PDF RAG.
     Sinon, chat général selon le profil de l'étudiant.
     """
+    answer, key = await answer_cache.lookup(ask_scope(request, current_user), request.question)
+    if answer is not None:
+        return {"answer": answer}
+
     try:
-        if request.course_id:
-            # Chat avec le PDF du cours
-            response = chat_with_pdf(
-                user_id=current_user.id,
-                course_id=request.course_id,
-                question=request.question
-            )
-        else:
-            # Chat général
-            response = chat_with_user(
-                user_id=current_user.id,
-                level=current_user.level,
-                field=current_user.field,
-                goal=current_user.goal,
-                question=request.question
-            )
+        prompt = await build_prompt(db, request, current_user)
+        # Prompts identiques en cours de génération : une seule génération partagée
+        response = await llm_flights.run(
+            prompt_key(prompt),
+            lambda: llm_executor.run(complete_prompt, prompt)
+        )
 
+        answer_cache.store(key, response)
         return {"answer": response}  # frontend attend "answer"
 
+    except HTTPException:
+        raise
+    except LLMSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/ask/stream")
+async def chat_stream(
+    request: ChatRequest,
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Même chatbot que /ask, réponse en streaming (text/event-stream).
+    La recherche dans les PDF est faite avant le premier octet : 404 / 503 restent de vrais statuts HTTP.
+    """
+    answer, key = await answer_cache.lookup(ask_scope(request, current_user), request.question)
+    if answer is not None:
+        return sse_cached_response(answer)
+
+    try:
+        prompt = await build_prompt(db, request, current_user)
+        stream = await llm_flights.stream(
+            prompt_key(prompt),
+            lambda: llm_executor.stream(stream_prompt, prompt),
+            on_complete=lambda text: answer_cache.store(key, text)
+        )
+
+    except HTTPException:
+        raise
+    except LLMSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return sse_response(stream)
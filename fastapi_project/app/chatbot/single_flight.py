@@ -0,0 +1,147 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable
+
+from app.chatbot.llm_executor import LLMStream
+
+# Coalescence des générations identiques en cours : une seule génération par clé,
+# tous les clients qui arrivent pendant qu'elle tourne en reçoivent le résultat (ou le flux).
+
+
+class SharedStream:
+    """
+    Diffuse un LLMStream à plusieurs abonnés. Les tokens déjà produits sont rejoués
+    aux abonnés arrivés en retard. Quand le dernier abonné se déconnecte, la génération est annulée.
+    """
+
+    def __init__(self, source: LLMStream, on_complete: Callable[[str], None] | None = None):
+        self._source = source
+        self._on_complete = on_complete
+        self._tokens: list[str] = []
+        self._error: Exception | None = None
+        self._changed = asyncio.Event()
+        self.done = False
+        self.subscribers = 0
+        self._task = asyncio.create_task(self._pump())
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _pump(self):
+        try:
+            async for token in self._source:
+                self._tokens.append(token)
+                self._notify()
+        except Exception as e:
+            self._error = e
+        else:
+            if self._on_complete is not None:
+                self._on_complete("".join(self._tokens))
+        finally:
+            self.done = True
+            self._notify()
+
+    def add_done_callback(self, fn: Callable[[], None]):
+        self._task.add_done_callback(lambda _: fn())
+
+    def subscribe(self) -> AsyncIterator[str]:
+        # Compté dès la remise du flux, avant la première lecture :
+        # un client qui n'a pas encore commencé à lire empêche l'annulation.
+        self.subscribers += 1
+        return self._follow()
+
+    async def _follow(self) -> AsyncIterator[str]:
+        position = 0
+        try:
+            while True:
+                while position < len(self._tokens):
+                    yield self._tokens[position]
+                    position += 1
+                if self.done:
+                    if self._error is not None:
+                        raise self._error
+                    if self._task.cancelled():
+                        raise RuntimeError("Generation cancelled")
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                self._task.cancel()
+
+
+class SingleFlight:
+    """Au plus une génération en cours par clé ; les appels suivants attendent la même."""
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key: Hashable) -> asyncio.Future | None:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        return future
+
+    def _lead(self, key: Hashable, awaitable: Awaitable) -> asyncio.Future:
+        self.leaders += 1
+        future = self._inflight[key] = asyncio.ensure_future(awaitable)
+        return future
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Résultat de fn() ; si la même clé est déjà en cours, attend ce résultat.
+        La génération n'est pas annulée si le premier client part : les autres l'attendent.
+        """
+        key = ("run", key)
+        future = self._join(key)
+        if future is None:
+            future = self._lead(key, fn())
+            future.add_done_callback(lambda f: self._forget(key, f))
+        return await asyncio.shield(future)
+
+    async def stream(
+        self,
+        key: Hashable,
+        open_stream: Callable[[], Awaitable[LLMStream]],
+        on_complete: Callable[[str], None] | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Flux de tokens partagé. open_stream() (réservation de la place LLM comprise) n'est appelé
+        que par le premier client ; ses erreurs (LLMSaturatedError...) remontent à tous les clients en attente.
+        """
+        key = ("stream", key)
+        future = self._join(key)
+        if future is None:
+            async def start() -> SharedStream:
+                shared = SharedStream(await open_stream(), on_complete)
+                shared.add_done_callback(lambda: self._forget(key, future))
+                return shared
+
+            future = self._lead(key, start())
+
+            def forget_if_failed(f: asyncio.Future):
+                if f.cancelled() or f.exception() is not None:
+                    self._forget(key, f)
+
+            future.add_done_callback(forget_if_failed)
+
+        shared: SharedStream = await asyncio.shield(future)
+        return shared.subscribe()
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.coalesced
+        return {
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / calls, 4) if calls else 0.0,
+        }
+
+
+llm_flights = SingleFlight()
@@ -0,0 +1,54 @@
+import json
+from typing import AsyncIterable, AsyncIterator, Callable
+
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.chatbot.llm_executor import LLMStream
+
+
+def sse_event(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def sse_tokens(stream: AsyncIterable[str], on_complete: Callable[[str], None] | None = None) -> AsyncIterator[str]:
+    """
+    Un événement par token, puis "done" ; "error" si la génération échoue en cours de route
+    (le statut HTTP est déjà parti). Une déconnexion du client annule l'itération.
+    on_complete reçoit la réponse complète, seulement si la génération est allée au bout.
+    """
+    tokens = []
+    try:
+        async for token in stream:
+            tokens.append(token)
+            yield sse_event({"token": token})
+    except Exception as e:
+        yield sse_event({"detail": str(e)}, event="error")
+        return
+    if on_complete is not None:
+        on_complete("".join(tokens))
+    yield sse_event({}, event="done")
+
+
+async def _sse_text(text: str) -> AsyncIterator[str]:
+    yield sse_event({"token": text})
+    yield sse_event({"cached": True}, event="done")
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_response(stream: AsyncIterable[str], on_complete: Callable[[str], None] | None = None) -> StreamingResponse:
+    return StreamingResponse(
+        sse_tokens(stream, on_complete),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+        # Si le flux n'est jamais lu, la place du LLM est rendue après la réponse
+        background=BackgroundTask(stream.release_if_unused) if isinstance(stream, LLMStream) else None,
+    )
+
+
+def sse_cached_response(answer: str) -> StreamingResponse:
+    """Réponse déjà connue (cache) : un seul token puis "done"."""
+    return StreamingResponse(_sse_text(answer), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,45 @@
+import re
+import unicodedata
+
+# Tokenisation pour le contenu des cours (en français) : minuscules, accents retirés,
+# élisions (l', d', qu'...) et mots vides ignorés, pluriels simples ramenés au singulier.
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS_FR = frozenset("""
+a ai aie aient ait al as au aux avec avoir c ce ceci cela celle celles celui ces cet cette
+ceux chaque comme comment d dans de des du elle elles en encore entre est et etaient etait
+ete etre eu eux il ils j je l la le les leur leurs lui m ma mais me meme mes moi mon n ne
+ni nos notre nous on ont ou par pas peu plus pour pourquoi qu quand que quel quelle quelles
+quels qui s sa sans se ses si son sont sur t ta te tes toi ton tous tout toute toutes tres
+tu un une vos votre vous y
+""".split())
+
+
+def fold_accents(text: str) -> str:
+    """'Réseaux Neuronaux' -> 'reseaux neuronaux'"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_text(text: str) -> str:
+    """'Explique les Réseaux neuronaux ?' -> 'explique les reseaux neuronaux' (mots vides gardés)"""
+    return " ".join(_TOKEN_RE.findall(fold_accents(text)))
+
+
+def _light_stem(token: str) -> str:
+    if token.endswith("eaux"):
+        return token[:-1]
+    if len(token) > 4 and token.endswith("aux"):
+        return token[:-3] + "al"
+    if len(token) > 3 and token[-1] in "sx":
+        return token[:-1]
+    return token
+
+
+def tokenize_fr(text: str) -> list[str]:
+    return [
+        _light_stem(token)
+        for token in _TOKEN_RE.findall(fold_accents(text))
+        if token not in STOPWORDS_FR
+    ]
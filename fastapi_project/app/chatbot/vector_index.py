@@ -0,0 +1,316 @@
+import json
+import os
+import shutil
+import threading
+import zlib
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from app.chatbot.text import tokenize_fr
+from app.core.file_lock import file_lock
+
+# Index vectoriel local par cours : matrices float32 sur disque, lues en memmap.
+#   course_<id>/manifest.json        {"version": v, "count": N} ; remplacé atomiquement
+#   course_<id>/v<v>/vectors.f32     N x EMBEDDING_DIM (au moins N lignes)
+#   course_<id>/v<v>/chunk_ids.i64   identifiants de PDFChunk
+#   course_<id>/v<v>/pdf_ids.i64     identifiants de PDF (pour la suppression)
+# Partagé par tous les workers : écritures sous verrou de fichier (flock) par cours,
+# relecture du manifeste quand il a changé. Dans une version, les fichiers ne font que
+# grandir et N (manifeste) fait foi : un ajout interrompu est ignoré puis écrasé. Une
+# suppression écrit une nouvelle version puis bascule le manifeste : ids et vecteurs
+# changent ensemble.
+
+INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "app/data/index")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "256"))
+SEARCH_BLOCK_ROWS = 65536
+
+EmbeddingFunction = Callable[[list[str]], np.ndarray]
+
+def hashing_embedding(texts: list[str]) -> np.ndarray:
+    """
+    Embedding local sans modèle (feature hashing des mots normalisés, signe aléatoire, norme L2).
+    Déterministe et hors ligne ; remplaçable via set_embedding_function().
+    """
+    out = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in tokenize_fr(text):
+            h = zlib.crc32(token.encode("utf-8"))
+            out[row, h % EMBEDDING_DIM] += 1.0 if h & 0x80000000 else -1.0
+
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return out / norms
+
+
+_embedding_function: EmbeddingFunction = hashing_embedding
+
+
+def set_embedding_function(fn: EmbeddingFunction):
+    """fn(list[str]) -> ndarray float32 (n, EMBEDDING_DIM), vecteurs normalisés."""
+    global _embedding_function
+    _embedding_function = fn
+
+
+def has_custom_embedding() -> bool:
+    """Vrai si un vrai modèle d'embedding de phrases a été enregistré via set_embedding_function()."""
+    return _embedding_function is not hashing_embedding
+
+
+def embed(texts: list[str]) -> np.ndarray:
+    return np.ascontiguousarray(_embedding_function(texts), dtype=np.float32)
+
+
+class _Snapshot(NamedTuple):
+    chunk_ids: np.ndarray
+    pdf_ids: np.ndarray
+    vectors: np.ndarray
+    id_order: np.ndarray  # argsort de chunk_ids
+
+
+_EMPTY_IDS = np.empty(0, dtype=np.int64)
+_FILES = ("vectors.f32", "pdf_ids.i64", "chunk_ids.i64")
+
+
+class CourseVectorIndex:
+    """
+    Index d'un cours. Ajouts en fin de fichier (incrémental), suppression d'un PDF
+    par réécriture filtrée dans une nouvelle version. Recherche exacte par produits
+    scalaires par blocs.
+    """
+
+    def __init__(self, course_id: int, root: str = INDEX_DIR, dim: int = EMBEDDING_DIM):
+        self.course_id = course_id
+        self.dim = dim
+        self.path = os.path.join(root, f"course_{course_id}")
+        self.lock_path = os.path.join(root, ".locks", f"course_{course_id}.lock")
+        self._manifest_path = os.path.join(self.path, "manifest.json")
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._snapshot = self._open_version(0, 0)
+        self._adopt_legacy()
+        self.refresh()
+
+    def _adopt_legacy(self):
+        """Ancien format (trois fichiers à la racine du cours, sans manifeste) -> version 1."""
+        if os.path.exists(self._manifest_path) or not os.path.exists(os.path.join(self.path, "chunk_ids.i64")):
+            return
+        with file_lock(self.lock_path):
+            if os.path.exists(self._manifest_path):
+                return
+            sizes = [os.path.getsize(os.path.join(self.path, name)) for name in _FILES]
+            count = min(sizes[0] // (self.dim * 4), sizes[1] // 8, sizes[2] // 8)
+            path = self._version_dir(1)
+            os.makedirs(path, exist_ok=True)
+            for name in _FILES:
+                os.replace(os.path.join(self.path, name), os.path.join(path, name))
+            self._write_manifest(1, count)
+
+    def _version_dir(self, version: int) -> str:
+        return os.path.join(self.path, f"v{version:06d}")
+
+    def _read_manifest(self) -> tuple[int, int]:
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            return manifest["version"], manifest["count"]
+        except FileNotFoundError:
+            return 0, 0
+
+    def _write_manifest(self, version: int, count: int):
+        tmp = self._manifest_path + f".{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "count": count}, f)
+        os.replace(tmp, self._manifest_path)
+
+    def _manifest_stamp(self):
+        try:
+            stat = os.stat(self._manifest_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """Recharge l'index si un autre processus (ou thread) a changé le manifeste."""
+        stamp = self._manifest_stamp()
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            for _ in range(3):
+                stamp = self._manifest_stamp()
+                if stamp == self._stamp:
+                    return
+                try:
+                    self._snapshot = self._open_version(*self._read_manifest())
+                    self._stamp = stamp
+                    return
+                except FileNotFoundError:
+                    continue  # version remplacée et effacée entre-temps : relire le manifeste
+            raise RuntimeError(f"Vector index of course {self.course_id} keeps changing")
+
+    def _open_version(self, version: int, count: int) -> _Snapshot:
+        if not count:
+            return _Snapshot(_EMPTY_IDS, _EMPTY_IDS, np.empty((0, self.dim), dtype=np.float32), _EMPTY_IDS)
+
+        path = self._version_dir(version)
+        chunk_ids = np.fromfile(os.path.join(path, "chunk_ids.i64"), dtype=np.int64, count=count)
+        pdf_ids = np.fromfile(os.path.join(path, "pdf_ids.i64"), dtype=np.int64, count=count)
+        vectors = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, self.dim))
+        return _Snapshot(chunk_ids, pdf_ids, vectors, np.argsort(chunk_ids, kind="stable"))
+
+    @property
+    def chunk_ids(self) -> np.ndarray:
+        return self._snapshot.chunk_ids
+
+    @property
+    def pdf_ids(self) -> np.ndarray:
+        return self._snapshot.pdf_ids
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._snapshot.vectors
+
+    def __len__(self) -> int:
+        return len(self._snapshot.chunk_ids)
+
+    def add(self, pdf_id: int, chunk_ids: list[int], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(chunk_ids), self.dim):
+            raise ValueError(f"Expected vectors of shape ({len(chunk_ids)}, {self.dim})")
+        if not chunk_ids:
+            return
+
+        with file_lock(self.lock_path):
+            version, count = self._read_manifest()
+            if version == 0:
+                version = 1
+            path = self._version_dir(version)
+            os.makedirs(path, exist_ok=True)
+
+            arrays = (vectors, np.full(len(chunk_ids), pdf_id, dtype=np.int64), np.asarray(chunk_ids, dtype=np.int64))
+            for name, array in zip(_FILES, arrays):
+                with open(os.path.join(path, name), "ab") as f:
+                    f.truncate(count * (array.nbytes // len(array)))  # ignorer un ajout interrompu
+                    array.tofile(f)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            self._write_manifest(version, count + len(chunk_ids))
+        self.refresh()
+
+    def remove_pdf(self, pdf_id: int):
+        with file_lock(self.lock_path):
+            version, count = self._read_manifest()
+            if not count:
+                return
+            current = self._open_version(version, count)
+            keep = current.pdf_ids != pdf_id
+            if keep.all():
+                return
+
+            # Nouvelle version complète, puis bascule atomique du manifeste
+            new_version = version + 1
+            path = self._version_dir(new_version)
+            shutil.rmtree(path, ignore_errors=True)  # reste d'une réécriture interrompue
+            os.makedirs(path)
+            with open(os.path.join(path, "vectors.f32"), "wb") as f:
+                for start in range(0, len(keep), SEARCH_BLOCK_ROWS):
+                    end = start + SEARCH_BLOCK_ROWS
+                    np.asarray(current.vectors[start:end][keep[start:end]]).tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            current.pdf_ids[keep].tofile(os.path.join(path, "pdf_ids.i64"))
+            current.chunk_ids[keep].tofile(os.path.join(path, "chunk_ids.i64"))
+
+            self._write_manifest(new_version, int(keep.sum()))
+            # Les memmaps déjà ouverts sur l'ancienne version restent lisibles (Linux)
+            shutil.rmtree(self._version_dir(version), ignore_errors=True)
+        self.refresh()
+
+    def score_chunks(self, query: np.ndarray, chunk_ids: list[int]) -> list[tuple[int, float]]:
+        """Score de quelques morceaux donnés (re-rank), triés par score décroissant."""
+        self.refresh()
+        snapshot = self._snapshot
+        ids, order, vectors = snapshot.chunk_ids, snapshot.id_order, snapshot.vectors
+        wanted = np.asarray(chunk_ids, dtype=np.int64)
+        if len(ids) == 0 or len(wanted) == 0:
+            return []
+
+        pos = np.minimum(np.searchsorted(ids, wanted, sorter=order), len(ids) - 1)
+        candidates = order[pos]
+        rows = np.sort(candidates[ids[candidates] == wanted])
+
+        scores = np.asarray(vectors[rows]) @ np.asarray(query, dtype=np.float32)
+        ranking = np.argsort(-scores)
+        return [(int(ids[rows[i]]), float(scores[i])) for i in ranking]
+
+    def search(self, query: np.ndarray, k: int = 5) -> list[tuple[int, float]]:
+        """Top-k (chunk_id, score) pour un vecteur requête normalisé."""
+        return self.search_batch(query.reshape(1, -1), k)[0]
+
+    def search_batch(self, queries: np.ndarray, k: int = 5) -> list[list[tuple[int, float]]]:
+        """Top-k pour plusieurs requêtes à la fois : un produit matriciel par bloc de lignes."""
+        self.refresh()
+        snapshot = self._snapshot
+        vectors, chunk_ids = snapshot.vectors, snapshot.chunk_ids
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        n = len(chunk_ids)
+        if n == 0 or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        best_scores, best_rows = [], []
+        for start in range(0, n, SEARCH_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS])
+            scores = queries @ block.T  # (m, rows)
+            if scores.shape[1] > k:
+                top = np.argpartition(scores, -k, axis=1)[:, -k:]
+            else:
+                top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            best_scores.append(np.take_along_axis(scores, top, axis=1))
+            best_rows.append(top + start)
+
+        scores = np.concatenate(best_scores, axis=1)
+        rows = np.concatenate(best_rows, axis=1)
+        order = np.argsort(-scores, axis=1)[:, :k]
+
+        return [
+            [(int(chunk_ids[rows[q, i]]), float(scores[q, i])) for i in order[q]]
+            for q in range(len(queries))
+        ]
+
+
+_indexes: dict[int, CourseVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_course_index(course_id: int) -> CourseVectorIndex:
+    with _indexes_lock:
+        index = _indexes.get(course_id)
+        if index is None:
+            index = _indexes[course_id] = CourseVectorIndex(course_id)
+        return index
+
+
+def add_to_course_index(course_id: int, pdf_id: int, chunk_ids: list[int], texts: list[str]):
+    if chunk_ids:
+        get_course_index(course_id).add(pdf_id, chunk_ids, embed(texts))
+
+
+def remove_from_course_index(course_id: int, pdf_id: int):
+    get_course_index(course_id).remove_pdf(pdf_id)
+
+
+def drop_course_index(course_id: int):
+    with _indexes_lock:
+        _indexes.pop(course_id, None)
+    # Les autres workers voient le manifeste disparaître : index vide
+    with file_lock(os.path.join(INDEX_DIR, ".locks", f"course_{course_id}.lock")):
+        shutil.rmtree(os.path.join(INDEX_DIR, f"course_{course_id}"), ignore_errors=True)
+
+
+def search_course(course_id: int, question: str, k: int = 5) -> list[tuple[int, float]]:
+    return get_course_index(course_id).search(embed([question])[0], k)
+
+
+def rerank_course(course_id: int, question: str, chunk_ids: list[int], k: int = 5) -> list[tuple[int, float]]:
+    return get_course_index(course_id).score_chunks(embed([question])[0], chunk_ids)[:k]
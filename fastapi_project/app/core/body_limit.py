@@ -0,0 +1,47 @@
+import os
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+# Marge pour les autres champs d'un formulaire multipart (titre, cours, en-têtes des parties)
+FORM_OVERHEAD = int(os.getenv("FORM_OVERHEAD_BYTES", str(64 * 1024)))
+
+
+class BodySizeLimitMiddleware:
+    """
+    Middleware ASGI : limite la taille du corps de certaines routes AVANT le parsing du formulaire
+    (UploadFile ne voit le fichier qu'une fois tout le multipart reçu et mis sur disque).
+
+    Content-Length au-delà de la limite : 413 sans lire le corps.
+    Corps sans Content-Length (chunked) : 413 dès que les octets reçus dépassent la limite.
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body larger than {limit // (1024 * 1024)} MB"
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Relevée telle quelle par FastAPI pendant le parsing du corps
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,94 @@
+import os
+from collections import Counter
+
+from sqlalchemy import bindparam, event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.models.course import Course
+from app.models.dashboard import DashboardCounter
+from app.models.enrollment import Enrollment
+from app.models.pdf import PDF
+from app.models.user import RoleEnum, User
+
+# aggregate : une requête d'agrégat (un seul aller-retour) à chaque expiration du cache
+# counters  : lecture de la table dashboard_counters, mise à jour à chaque flush de l'ORM
+DASHBOARD_MODE = os.getenv("DASHBOARD_MODE", "aggregate")
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "10"))
+
+COUNTER_NAMES = (
+    "total_users",
+    "total_students",
+    "total_teachers",
+    "total_courses",
+    "total_pdfs",
+    "total_enrollments",
+)
+
+_MODEL_COUNTERS = {
+    Course: "total_courses",
+    PDF: "total_pdfs",
+    Enrollment: "total_enrollments",
+}
+
+_ROLE_COUNTERS = {
+    RoleEnum.student: "total_students",
+    RoleEnum.teacher: "total_teachers",
+}
+
+dashboard_cache = TTLCache("admin_dashboard", maxsize=1, ttl=DASHBOARD_CACHE_TTL)
+
+
+def _role_counter(role) -> str | None:
+    # Le défaut de la colonne (student) n'est pas encore appliqué sur un objet jamais flushé
+    return _ROLE_COUNTERS.get(RoleEnum(role) if role is not None else RoleEnum.student)
+
+
+def flush_deltas(session: Session) -> Counter:
+    """Variation des compteurs induite par les objets ajoutés, supprimés ou modifiés du flush."""
+    deltas = Counter()
+
+    for objects, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            if isinstance(obj, User):
+                deltas["total_users"] += sign
+                role_counter = _role_counter(obj.role)
+                if role_counter:
+                    deltas[role_counter] += sign
+            elif type(obj) in _MODEL_COUNTERS:
+                deltas[_MODEL_COUNTERS[type(obj)]] += sign
+
+    # Changement de rôle d'un utilisateur existant
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            history = inspect(obj).attrs.role.history
+            if history.deleted and history.added:
+                for role, sign in ((history.deleted[0], -1), (history.added[0], 1)):
+                    role_counter = _role_counter(role)
+                    if role_counter:
+                        deltas[role_counter] += sign
+
+    return deltas
+
+
+_increment = (
+    DashboardCounter.__table__.update()
+    .where(DashboardCounter.__table__.c.name == bindparam("counter"))
+    .values(value=DashboardCounter.__table__.c.value + bindparam("delta"))
+)
+
+
+def _apply_deltas(session: Session, flush_context):
+    deltas = [{"counter": name, "delta": delta} for name, delta in flush_deltas(session).items() if delta]
+    if deltas:
+        # Même connexion, même transaction que les écritures : rien n'est compté si elles sont annulées
+        session.connection().execute(_increment, deltas)
+
+
+def install_dashboard_counters():
+    if not event.contains(Session, "after_flush", _apply_deltas):
+        event.listen(Session, "after_flush", _apply_deltas)
+
+
+if DASHBOARD_MODE == "counters":
+    install_dashboard_counters()
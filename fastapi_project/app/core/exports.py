@@ -0,0 +1,73 @@
+import csv
+import enum
+import io
+import json
+import os
+from datetime import date, datetime
+from typing import Any, AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from app.db.database import AsyncSessionLocal
+
+# Exports en flux : les lignes sont lues par lots depuis un curseur côté serveur (yield_per)
+# et encodées au fil de l'eau ; la mémoire ne dépend pas du nombre de lignes.
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+async def stream_partitions(stmt: Select, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[list]:
+    # Session propre au flux : celle de la requête est fermée avant l'envoi du corps
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+
+
+async def encode_csv(columns: list[str], partitions: AsyncIterator[list]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    async for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+
+
+async def encode_ndjson(columns: list[str], partitions: AsyncIterator[list]) -> AsyncIterator[str]:
+    async for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+def export_response(name: str, stmt: Select, fmt: str) -> StreamingResponse:
+    """Réponse en flux de stmt (colonnes nommées) au format csv ou ndjson ; ValueError si format inconnu."""
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    columns = list(stmt.selected_columns.keys())
+    encode = encode_csv if fmt == "csv" else encode_ndjson
+    return StreamingResponse(
+        encode(columns, stream_partitions(stmt)),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
@@ -0,0 +1,35 @@
+import fcntl
+import os
+from contextlib import asynccontextmanager, contextmanager
+
+from starlette.concurrency import run_in_threadpool
+
+# Verrous exclusifs entre processus (workers uvicorn/gunicorn) par fichier verrou (flock).
+# Le verrou est libéré à la fermeture du descripteur, y compris si le processus meurt.
+
+
+def _open(path: str) -> int:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+@contextmanager
+def file_lock(path: str):
+    """Verrou bloquant, pour le code synchrone (threads)."""
+    fd = _open(path)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+@asynccontextmanager
+async def async_file_lock(path: str):
+    """Même verrou depuis la boucle asyncio : l'attente se fait dans un thread."""
+    fd = _open(path)
+    try:
+        await run_in_threadpool(fcntl.flock, fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
@@ -0,0 +1,455 @@
+import asyncio
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_left
+from typing import Iterator
+
+# Métriques au format texte Prometheus (GET /metrics).
+#
+# Pas de verrou : les valeurs ne sont modifiées que depuis la boucle asyncio du processus.
+# Un seul processus : valeurs en mémoire. Plusieurs workers (METRICS_MULTIPROC_DIR) :
+# chaque processus écrit dans son propre fichier mappé en mémoire (un seul écrivain par fichier),
+# et /metrics additionne les fichiers du répertoire. Les jauges des processus terminés sont ignorées ;
+# vider le répertoire au démarrage du service.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_SAMPLE_INTERVAL = float(os.getenv("METRICS_SAMPLE_INTERVAL", "5"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------- Stockage ----------
+
+class _MemoryValues:
+    def __init__(self):
+        self._values: dict[str, float] = {}
+
+    def add(self, key: str, amount: float):
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key: str, value: float):
+        self._values[key] = value
+
+    def items(self) -> Iterator[tuple[str, float]]:
+        return iter(list(self._values.items()))
+
+
+class _MmapValues:
+    """
+    Fichier du processus : en-tête [octets utilisés : u32, 4 octets de bourrage], puis des entrées
+    [longueur de la clé : u32][clé utf-8 complétée pour aligner la valeur sur 8 octets][valeur : f64].
+    Une entrée est écrite entière avant la mise à jour de l'en-tête : un lecteur ne voit jamais d'entrée partielle.
+    """
+
+    _HEADER = 8
+    _INITIAL_SIZE = 1 << 16
+
+    def __init__(self, path: str):
+        self._file = open(path, "a+b")
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(self._INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        # Valeurs alignées sur 8 octets : accès direct par index de double
+        self._doubles = memoryview(self._map).cast("d")
+        self._used = struct.unpack_from("I", self._map, 0)[0] or self._HEADER
+        struct.pack_into("I", self._map, 0, self._used)
+        self._slots = {key: offset // 8 for key, offset, _ in self._entries(self._map)}
+
+    @classmethod
+    def _entries(cls, data) -> Iterator[tuple[str, int, float]]:
+        used = struct.unpack_from("I", data, 0)[0]
+        pos = cls._HEADER
+        while pos < used:
+            length = struct.unpack_from("I", data, pos)[0]
+            padded = length + (-(4 + length) % 8)
+            key = bytes(data[pos + 4:pos + 4 + length]).decode()
+            offset = pos + 4 + padded
+            yield key, offset, struct.unpack_from("d", data, offset)[0]
+            pos = offset + 8
+
+    def _slot(self, key: str) -> int:
+        slot = self._slots.get(key)
+        if slot is not None:
+            return slot
+
+        encoded = key.encode()
+        padded = encoded + b" " * (-(4 + len(encoded)) % 8)
+        size = 4 + len(padded) + 8
+        if self._used + size > len(self._map):
+            capacity = len(self._map)
+            while self._used + size > capacity:
+                capacity *= 2
+            self._doubles.release()
+            self._map.close()
+            self._file.truncate(capacity)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            self._doubles = memoryview(self._map).cast("d")
+
+        struct.pack_into(f"I{len(padded)}sd", self._map, self._used, len(encoded), padded, 0.0)
+        slot = (self._used + 4 + len(padded)) // 8
+        self._used += size
+        struct.pack_into("I", self._map, 0, self._used)
+        self._slots[key] = slot
+        return slot
+
+    def add(self, key: str, amount: float):
+        slot = self._slot(key)  # avant self._doubles : peut agrandir le fichier et changer la vue
+        self._doubles[slot] += amount
+
+    def set(self, key: str, value: float):
+        slot = self._slot(key)
+        self._doubles[slot] = value
+
+    def items(self) -> Iterator[tuple[str, float]]:
+        return ((key, value) for key, _, value in self._entries(self._map))
+
+    @classmethod
+    def read(cls, path: str) -> list[tuple[str, float]]:
+        with open(path, "rb") as f:
+            data = f.read()
+        return [(key, value) for key, _, value in cls._entries(data)] if len(data) >= cls._HEADER else []
+
+
+def _process_file(pid: int) -> str:
+    return os.path.join(METRICS_MULTIPROC_DIR, f"metrics_{pid}.db")
+
+
+def _open_values():
+    return _MmapValues(_process_file(os.getpid())) if METRICS_MULTIPROC_DIR else _MemoryValues()
+
+
+_values = _open_values()
+
+
+def _reopen_after_fork():
+    # Worker forké après le chargement de l'application : son propre fichier, compteurs à zéro
+    global _values
+    _values = _open_values()
+    for metric in REGISTRY.values():
+        metric._children.clear()
+
+
+os.register_at_fork(after_in_child=_reopen_after_fork)
+
+
+# ---------- Types de métriques ----------
+
+REGISTRY: dict[str, "Metric"] = {}
+
+
+def _key(sample: str, labels: tuple[tuple[str, str], ...]) -> str:
+    return json.dumps([sample, labels], separators=(",", ":"))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._children: dict[tuple, object] = {}
+        REGISTRY[name] = self
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._child(tuple(zip(self.labelnames, map(str, values))))
+        return child
+
+    def _child(self, labels):
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("key",)
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def inc(self, amount: float = 1.0):
+        _values.add(self.key, amount)
+
+    def dec(self, amount: float = 1.0):
+        _values.add(self.key, -amount)
+
+    def set(self, value: float):
+        _values.set(self.key, value)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _child(self, labels):
+        return _Value(_key(self.name + "_total", labels))
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    """Somme sur les processus vivants."""
+    kind = "gauge"
+
+    def _child(self, labels):
+        return _Value(_key(self.name, labels))
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class HitRatio(Metric):
+    """Jauge calculée à l'exposition : hits / (hits + misses), après agrégation des processus."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, hits: Counter, misses: Counter):
+        self.hits = hits
+        self.misses = misses
+        super().__init__(name, help, hits.labelnames)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "bucket_keys", "sum_key", "count_key")
+
+    def __init__(self, bounds, bucket_keys, sum_key, count_key):
+        self.bounds = bounds
+        self.bucket_keys = bucket_keys
+        self.sum_key = sum_key
+        self.count_key = count_key
+
+    def observe(self, value: float):
+        # Compte par intervalle ; cumulé seulement à l'exposition
+        _values.add(self.bucket_keys[bisect_left(self.bounds, value)], 1.0)
+        _values.add(self.sum_key, value)
+        _values.add(self.count_key, 1.0)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = ()):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _child(self, labels):
+        les = [_format_value(bound) for bound in self.bounds] + ["+Inf"]
+        return _HistogramChild(
+            self.bounds,
+            [_key(self.name + "_bucket", labels + (("le", le),)) for le in les],
+            _key(self.name + "_sum", labels),
+            _key(self.name + "_count", labels),
+        )
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+
+# ---------- Exposition ----------
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _aggregate() -> dict[str, float]:
+    if not METRICS_MULTIPROC_DIR:
+        return dict(_values.items())
+
+    gauges = {name for name, metric in REGISTRY.items() if metric.kind == "gauge"}
+    totals: dict[str, float] = {}
+    for path in glob.glob(os.path.join(METRICS_MULTIPROC_DIR, "metrics_*.db")):
+        pid = int(os.path.basename(path)[len("metrics_"):-len(".db")])
+        alive = pid == os.getpid() or _pid_alive(pid)
+        for key, value in _MmapValues.read(path):
+            if not alive and json.loads(key)[0] in gauges:
+                continue
+            totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def render_metrics() -> str:
+    samples: dict[str, list[tuple[tuple, float]]] = {}
+    for key, value in _aggregate().items():
+        sample, labels = json.loads(key)
+        samples.setdefault(sample, []).append((tuple(map(tuple, labels)), value))
+
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        if metric.kind == "counter":
+            for labels, value in sorted(samples.get(name + "_total", [])):
+                lines.append(f"{name}_total{_format_labels(labels)} {_format_value(value)}")
+        elif isinstance(metric, HitRatio):
+            hits = dict(samples.get(metric.hits.name + "_total", []))
+            misses = dict(samples.get(metric.misses.name + "_total", []))
+            for labels in sorted(hits.keys() | misses.keys()):
+                lookups = hits.get(labels, 0.0) + misses.get(labels, 0.0)
+                ratio = hits.get(labels, 0.0) / lookups if lookups else 0.0
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(round(ratio, 4))}")
+        elif metric.kind == "gauge":
+            for labels, value in sorted(samples.get(name, [])):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        else:
+            lines.extend(_render_histogram(metric, samples))
+    return "\n".join(lines) + "\n"
+
+
+def _render_histogram(metric: Histogram, samples: dict) -> list[str]:
+    les = [_format_value(bound) for bound in metric.bounds] + ["+Inf"]
+    buckets: dict[tuple, dict[str, float]] = {}
+    for labels, value in samples.get(metric.name + "_bucket", []):
+        base = tuple(label for label in labels if label[0] != "le")
+        buckets.setdefault(base, {})[dict(labels)["le"]] = value
+
+    sums = dict(samples.get(metric.name + "_sum", []))
+    counts = dict(samples.get(metric.name + "_count", []))
+    lines = []
+    for base in sorted(buckets):
+        cumulative = 0.0
+        for le in les:
+            cumulative += buckets[base].get(le, 0.0)
+            lines.append(f"{metric.name}_bucket{_format_labels(base + (('le', le),))} {_format_value(cumulative)}")
+        lines.append(f"{metric.name}_sum{_format_labels(base)} {_format_value(sums.get(base, 0.0))}")
+        lines.append(f"{metric.name}_count{_format_labels(base)} {_format_value(counts.get(base, 0.0))}")
+    return lines
+
+
+# ---------- Métriques de l'application ----------
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+http_requests = Counter("http_requests", "HTTP requests by route template and status", ("method", "route", "status"))
+http_latency = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route"), LATENCY_BUCKETS
+)
+http_response_size = Histogram(
+    "http_response_size_bytes", "HTTP response body size by route template", ("method", "route"), SIZE_BUCKETS
+)
+http_in_progress = Gauge("http_requests_in_progress", "HTTP requests being served")
+
+db_pool_size = Gauge("db_pool_size", "Connection pool size (primary)")
+db_pool_checked_out = Gauge("db_pool_checked_out", "Connections in use (primary)")
+db_pool_overflow = Gauge("db_pool_overflow", "Overflow connections open (primary)")
+db_pool_checkouts = Counter("db_pool_checkouts", "Connection checkouts")
+db_pool_timeouts = Counter("db_pool_timeouts", "Connection checkouts that timed out")
+db_pool_wait = Counter("db_pool_checkout_wait_seconds", "Time spent waiting for a connection")
+
+llm_queue_depth = Gauge("llm_queue_depth", "LLM calls waiting for a slot")
+llm_running = Gauge("llm_running", "LLM calls running")
+llm_calls = Counter("llm_calls", "LLM calls by outcome", ("outcome",))
+
+cache_hits = Counter("cache_hits", "Cache hits", ("cache",))
+cache_misses = Counter("cache_misses", "Cache misses", ("cache",))
+cache_hit_ratio = HitRatio("cache_hit_ratio", "Cache hit ratio since start", cache_hits, cache_misses)
+cache_entries = Gauge("cache_entries", "Cache entries", ("cache",))
+
+
+def collect_runtime():
+    """Recopie les statistiques internes (pool, LLM, caches) dans les métriques du processus."""
+    from app.chatbot.llm_executor import llm_executor
+    from app.core.cache import caches
+    from app.db.database import pool_stats
+
+    pool = pool_stats()
+    db_pool_size.set(pool.get("size", 0))
+    db_pool_checked_out.set(pool.get("checked_out", 0))
+    db_pool_overflow.set(max(pool.get("overflow", 0), 0))
+    # Compteurs cumulés du processus : valeur absolue recopiée
+    db_pool_checkouts.labels().set(pool["checkouts"])
+    db_pool_timeouts.labels().set(pool["timeouts"])
+    db_pool_wait.labels().set(pool["wait_seconds_total"])
+
+    llm = llm_executor.stats()
+    llm_queue_depth.set(llm["queue_depth"])
+    llm_running.set(llm["running"])
+    for outcome in ("completed", "failed", "rejected", "timed_out"):
+        llm_calls.labels(outcome).set(llm[outcome])
+
+    for name, cache in caches.items():
+        stats = cache.stats()
+        cache_hits.labels(name).set(stats["hits"])
+        cache_misses.labels(name).set(stats["misses"])
+        cache_entries.labels(name).set(stats["size"])
+
+
+async def sample_forever():
+    """Multi-processus : chaque worker publie ses statistiques internes à intervalle régulier."""
+    while True:
+        collect_runtime()
+        await asyncio.sleep(METRICS_SAMPLE_INTERVAL)
+
+
+# ---------- Middleware ----------
+
+class MetricsMiddleware:
+    """Middleware ASGI : latence, taille de réponse et statut par gabarit de route, requêtes en cours."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        http_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            http_in_progress.dec()
+            # Gabarit (/quizzes/{quiz_id}) et non le chemin : cardinalité bornée
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            method = scope["method"]
+            http_latency.labels(method, route).observe(time.perf_counter() - started)
+            http_response_size.labels(method, route).observe(size)
+            http_requests.labels(method, route, status).inc()
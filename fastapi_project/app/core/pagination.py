@@ -0,0 +1,75 @@
+import base64
+import json
+import os
+from datetime import datetime
+
+from fastapi import Response
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Pagination par clé (keyset) sur (date de création, id) : coût constant quelle que soit la page,
+# contrairement à OFFSET. Le curseur est opaque pour le client ; la page suivante
+# est annoncée dans l'en-tête X-Next-Cursor (absent sur la dernière page).
+# Sans cursor ni limit, la liste complète est renvoyée comme avant (clients existants).
+
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def fetch_page(
+    db: AsyncSession,
+    stmt: Select,
+    created_col,
+    id_col,
+    cursor: str | None,
+    limit: int | None,
+) -> tuple[list, str | None]:
+    """
+    Exécute stmt (filtres déjà appliqués) trié par (created_col, id_col) à partir du curseur.
+    Renvoie (objets, curseur suivant ou None). ValueError si le curseur est invalide.
+    limit None : tout sans curseur, PAGE_SIZE si un curseur est fourni.
+    """
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(created_col, id_col) > tuple_(created_at, last_id))
+        limit = limit or PAGE_SIZE
+
+    stmt = stmt.order_by(created_col, id_col)
+    if limit is None:
+        return (await db.execute(stmt)).scalars().all(), None
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    rows = (await db.execute(stmt.limit(limit + 1))).scalars().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
+
+
+def like_pattern(term: str) -> str:
+    """Motif ILIKE « contient term », avec %, _ et \\ échappés (à utiliser avec escape="\\")."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def set_next_cursor(response: Response, next_cursor: str | None):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
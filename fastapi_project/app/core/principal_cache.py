@@ -0,0 +1,63 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+from app.core.cache import TTLCache
+from app.models.user import RoleEnum, LevelEnum, User
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Utilisateur authentifié, détaché de toute session pour pouvoir être mis en cache."""
+    id: int
+    username: str
+    email: str
+    role: RoleEnum
+    level: LevelEnum | None
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            role=user.role,
+            level=user.level,
+            is_active=user.is_active,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+# Clé : sujet du token (email). TTL court : seule borne de fraîcheur entre workers.
+principal_cache = TTLCache(
+    "principals",
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "30")),
+)
+
+_subject_by_user_id: dict[int, str] = {}
+
+
+def get_principal(subject: str) -> Principal | None:
+    return principal_cache.get(subject)
+
+
+def cache_principal(subject: str, principal: Principal):
+    principal_cache.set(subject, principal)
+    _subject_by_user_id[principal.id] = subject
+
+    # Ne garder l'index que pour les entrées encore en cache
+    if len(_subject_by_user_id) > 2 * principal_cache.maxsize:
+        live = {p.id: p.email for p in principal_cache.values()}
+        _subject_by_user_id.clear()
+        _subject_by_user_id.update(live)
+
+
+def invalidate_principal(user_id: int):
+    subject = _subject_by_user_id.pop(user_id, None)
+    if subject is not None:
+        principal_cache.invalidate(subject)
@@ -0,0 +1,100 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping
+
+from app.core.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class QuizSnapshot:
+    """
+    Version compacte et en lecture seule d'un quiz (questions, options, bonnes réponses).
+    Le bit n de correct_bits vaut 1 si la n-ième option du quiz est correcte.
+    """
+    id: int
+    title: str
+    course_id: int | None
+    created_at: datetime | None
+    question_ids: tuple[int, ...]
+    question_texts: tuple[str, ...]
+    options: tuple[tuple[tuple[int, str], ...], ...]  # par question : (option_id, text)
+    option_index: Mapping[int, tuple[int, int]]  # option_id -> (question_id, bit)
+    correct_bits: int
+
+    @classmethod
+    def from_quiz(cls, quiz) -> "QuizSnapshot":
+        question_ids, question_texts, options = [], [], []
+        option_index = {}
+        correct_bits = 0
+        bit = 0
+
+        for question in quiz.questions:
+            question_ids.append(question.id)
+            question_texts.append(question.question)
+            question_options = []
+            for option in question.options:
+                question_options.append((option.id, option.text))
+                option_index[option.id] = (question.id, bit)
+                if option.is_correct:
+                    correct_bits |= 1 << bit
+                bit += 1
+            options.append(tuple(question_options))
+
+        return cls(
+            id=quiz.id,
+            title=quiz.title,
+            course_id=quiz.course_id,
+            created_at=quiz.created_at,
+            question_ids=tuple(question_ids),
+            question_texts=tuple(question_texts),
+            options=tuple(options),
+            option_index=MappingProxyType(option_index),
+            correct_bits=correct_bits,
+        )
+
+    @property
+    def total_questions(self) -> int:
+        return len(self.question_ids)
+
+    def get(self, option_id: int, default=None) -> tuple[int, bool] | None:
+        """option_id -> (question_id, is_correct), comme l'option_map de grade_answers."""
+        entry = self.option_index.get(option_id)
+        if entry is None:
+            return default
+        question_id, bit = entry
+        return question_id, bool(self.correct_bits >> bit & 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "course_id": self.course_id,
+            "questions": [
+                {
+                    "id": question_id,
+                    "question": text,
+                    "options": [
+                        {"id": option_id, "text": option_text, "is_correct": self.get(option_id)[1]}
+                        for option_id, option_text in options
+                    ]
+                }
+                for question_id, text, options in zip(self.question_ids, self.question_texts, self.options)
+            ]
+        }
+
+
+quiz_cache = TTLCache(
+    "quiz_snapshots",
+    maxsize=int(os.getenv("QUIZ_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("QUIZ_CACHE_TTL", "600")),
+)
+
+
+def invalidate_quiz(quiz_id: int):
+    quiz_cache.invalidate(quiz_id)
+
+
+def invalidate_course_quizzes(course_id: int):
+    quiz_cache.invalidate_where(lambda _, snapshot: snapshot.course_id == course_id)
@@ -2,15 +2,38 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from app.models.user import User
-from app.models.user import RoleEnum
+from app.models.user import RoleEnum, LevelEnum
 from app.models.course import Course
 from app.models.pdf import PDF
 from app.models.enrollment import Enrollment
 from app.schemas.schemas import UserCreate, UserUpdate, CourseCreate, CourseUpdate
-from app.models.quiz import Quiz, QuizOption, QuizQuestion, QuizResult
-from app.schemas.schemas import QuizCreate, QuizAnswer, QuizOut
-from sqlalchemy import and_
-
+from app.models.quiz import Quiz, QuizOption, QuizQuestion, QuizResult, UserQuizStats
+from app.schemas.schemas import QuizCreate, QuizAnswer, QuizOut, QuizQuestionCreate
+from sqlalchemy import and_, case, func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app.models.dashboard import DashboardCounter
+from app.db.database import AsyncSessionLocal
+from app.core.dashboard_counters import DASHBOARD_MODE, COUNTER_NAMES, dashboard_cache
+from app.core.principal_cache import invalidate_principal
+from app.chatbot.vector_index import drop_course_index
+from app.chatbot.bm25_index import invalidate_bm25
+from app.chatbot.answer_cache import invalidate_course_answers
+from starlette.concurrency import run_in_threadpool
+from app.core.quiz_cache import QuizSnapshot, quiz_cache, invalidate_quiz, invalidate_course_quizzes
+from app.core.pagination import fetch_page, like_pattern
+from typing import AsyncIterator, Mapping
+from datetime import datetime
+
+
+class NotFoundError(ValueError):
+    """Ressource absente (404 côté routeur) ; les autres ValueError sont des refus ou des données invalides."""
+
+
+def upsert_insert(db: AsyncSession, model):
+    """INSERT ... ON CONFLICT du dialecte de la session (PostgreSQL ou SQLite)."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(model)
 
 
 class UserCRUD:
@@ -31,6 +54,25 @@ class UserCRUD:
         result = await db.execute(select(User).offset(skip).limit(limit))
         return result.scalars().all()
 
+    async def list_users(
+        self,
+        db: AsyncSession,
+        cursor: str | None = None,
+        limit: int | None = None,
+        role: RoleEnum | None = None,
+        level: LevelEnum | None = None,
+        is_active: bool | None = None,
+    ) -> tuple[list[User], str | None]:
+        """Page d'utilisateurs triée par (created_at, id) ; ValueError si le curseur est invalide."""
+        stmt = select(User)
+        if role is not None:
+            stmt = stmt.where(User.role == role)
+        if level is not None:
+            stmt = stmt.where(User.level == level)
+        if is_active is not None:
+            stmt = stmt.where(User.is_active == is_active)
+        return await fetch_page(db, stmt, User.created_at, User.id, cursor, limit)
+
     async def create_user(self, db: AsyncSession, user: UserCreate) -> User:
         db_user = User(
             username=user.username,
@@ -56,6 +98,7 @@ class UserCRUD:
             setattr(db_user, field, value)  # store plain password directly
         await db.commit()
         await db.refresh(db_user)
+        invalidate_principal(user_id)
         return db_user
 
     async def delete_user(self, db: AsyncSession, user_id: int) -> User | None:
@@ -65,6 +108,7 @@ class UserCRUD:
             return None
         await db.delete(db_user)
         await db.commit()
+        invalidate_principal(user_id)
         return db_user
 
     def verify_password(self, plain_password: str, db_password: str) -> bool:
@@ -92,6 +136,25 @@ class CourseCRUD:
         result = await db.execute(select(Course))
         return result.scalars().all()
 
+    async def list_courses(
+        self,
+        db: AsyncSession,
+        cursor: str | None = None,
+        limit: int | None = None,
+        teacher_id: int | None = None,
+        title: str | None = None,
+        with_owner: bool = False,
+    ) -> tuple[list[Course], str | None]:
+        """Page de cours triée par (created_at, id) ; title : recherche partielle sans casse."""
+        stmt = select(Course)
+        if teacher_id is not None:
+            stmt = stmt.where(Course.teacher_id == teacher_id)
+        if title:
+            stmt = stmt.where(Course.title.ilike(like_pattern(title), escape="\\"))
+        if with_owner:
+            stmt = stmt.options(selectinload(Course.owner))
+        return await fetch_page(db, stmt, Course.created_at, Course.id, cursor, limit)
+
     async def get_course_by_id(self, db: AsyncSession, course_id: int):
         result = await db.execute(select(Course).where(Course.id == course_id))
         return result.scalar_one_or_none()
@@ -110,8 +173,16 @@ class CourseCRUD:
         course = await self.get_course_by_id(db, course_id)
         if not course:
             return None
+        # Les résultats des quiz du cours partent en cascade : on les retire des agrégats
+        user_ids = await discount_results(db, QuizResult.quiz_id.in_(select(Quiz.id).where(Quiz.course_id == course_id)))
         await db.delete(course)
         await db.commit()
+        for user_id in user_ids:
+            invalidate_principal(user_id)
+        invalidate_course_quizzes(course_id)
+        await run_in_threadpool(drop_course_index, course_id)
+        invalidate_bm25(course_id)
+        invalidate_course_answers(course_id)
         return course
 
 
@@ -131,6 +202,20 @@ class PDFCRUD:
         result = await db.execute(select(PDF).where(PDF.course_id == course_id))
         return result.scalars().all()
 
+    async def list_course_pdfs(
+        self,
+        db: AsyncSession,
+        course_id: int,
+        cursor: str | None = None,
+        limit: int | None = None,
+        title: str | None = None,
+    ) -> tuple[list[PDF], str | None]:
+        """Page des PDF d'un cours triée par (uploaded_at, id)."""
+        stmt = select(PDF).where(PDF.course_id == course_id)
+        if title:
+            stmt = stmt.where(PDF.title.ilike(like_pattern(title), escape="\\"))
+        return await fetch_page(db, stmt, PDF.uploaded_at, PDF.id, cursor, limit)
+
     async def delete_pdf(self, db: AsyncSession, pdf_id: int):
         result = await db.execute(select(PDF).where(PDF.id == pdf_id))
         pdf = result.scalars().first()
@@ -150,7 +235,20 @@ class EnrollmentCRUD:
     async def enroll_student(self, db: AsyncSession, student_id: int, course_id: int):
         enrollment = Enrollment(student_id=student_id, course_id=course_id)
         db.add(enrollment)
-        await db.commit()
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Double clic : l'inscription existe déjà (contrainte uq_enrollments_student_course)
+            await db.rollback()
+            existing = await db.scalar(
+                select(Enrollment).where(
+                    Enrollment.student_id == student_id,
+                    Enrollment.course_id == course_id,
+                )
+            )
+            if existing is None:
+                raise
+            return existing
         await db.refresh(enrollment)
         return enrollment
 
@@ -167,51 +265,178 @@ enrollment_crud = EnrollmentCRUD()
 
 PASS_SCORE = 70  
 
+
+def grade_answers(option_map: Mapping[int, tuple[int, bool]] | QuizSnapshot, answers: list[QuizAnswer]) -> int:
+    """
+    Calcule le score d'un ensemble de réponses sans requête SQL.
+    option_map : option_id -> (question_id, is_correct) pour les options du quiz
+    (dict ou QuizSnapshot).
+    Les options hors quiz sont ignorées, seule la première réponse par question compte.
+    """
+    score = 0
+    answered_questions = set()
+
+    for answer in answers:
+        entry = option_map.get(answer.option_id)
+        if entry is None:
+            continue  # option invalide
+
+        question_id, is_correct = entry
+        if question_id in answered_questions:
+            continue  # déjà répondu
+
+        answered_questions.add(question_id)
+        if is_correct:
+            score += 1
+
+    return score
+
+
+def level_for_average(avg: float) -> LevelEnum:
+    if avg >= 80:
+        return LevelEnum.advanced
+    if avg >= 50:
+        return LevelEnum.intermediate
+    return LevelEnum.beginner
+
+
+def level_case(avg):
+    """level_for_average en SQL (avg NULL, sans résultat : beginner)."""
+    return case(
+        (avg >= 80, LevelEnum.advanced.value),
+        (avg >= 50, LevelEnum.intermediate.value),
+        else_=LevelEnum.beginner.value,
+    )
+
+
+async def discount_results(db: AsyncSession, condition) -> list[int]:
+    """
+    Retire des agrégats user_quiz_stats les QuizResult qui vérifient condition (avant leur
+    suppression en cascade avec un quiz ou un cours) et recalcule le niveau des utilisateurs
+    concernés. Ne commit pas ; renvoie les utilisateurs touchés.
+    """
+    user_ids = (await db.scalars(select(QuizResult.user_id).where(condition).distinct())).all()
+    if not user_ids:
+        return []
+
+    removed = select(QuizResult).where(QuizResult.user_id == UserQuizStats.user_id, condition)
+    await db.execute(
+        update(UserQuizStats)
+        .where(UserQuizStats.user_id.in_(user_ids))
+        .values(
+            percentage_sum=UserQuizStats.percentage_sum - removed.with_only_columns(
+                func.coalesce(func.sum(QuizResult.percentage), 0)
+            ).scalar_subquery(),
+            results_count=UserQuizStats.results_count - removed.with_only_columns(
+                func.count(QuizResult.id)
+            ).scalar_subquery(),
+            updated_at=datetime.utcnow(),
+        )
+    )
+
+    average = (
+        select(UserQuizStats.percentage_sum / UserQuizStats.results_count)
+        .where(UserQuizStats.user_id == User.id, UserQuizStats.results_count > 0)
+        .scalar_subquery()
+    )
+    await db.execute(update(User).where(User.id.in_(user_ids)).values(level=level_case(average)))
+    return list(user_ids)
+
+
 class QuizCRUD:
     # Création d'un quiz (prof/admin)
 
-    async def create_quiz(self, db: AsyncSession, quiz_data: QuizCreate, user_id: int, user_role: RoleEnum):
+    async def _get_authorized_course(self, db: AsyncSession, course_id: int, user_id: int, user_role: RoleEnum):
         course_res = await db.execute(
-            select(Course).where(Course.id == quiz_data.course_id)
+            select(Course).where(Course.id == course_id)
         )
         course = course_res.scalars().first()
 
         if not course:
-            raise ValueError("Course not found")
+            raise NotFoundError("Course not found")
 
         # Vérification des permissions
         if user_role == RoleEnum.teacher and course.teacher_id != user_id:
             raise ValueError("Not authorized to create quiz for this course")
 
-        # Créer le quiz
+        return course
+
+    async def _new_quiz(self, db: AsyncSession, title: str, course_id: int) -> Quiz:
         quiz = Quiz(
-            title=quiz_data.title,
-            course_id=quiz_data.course_id
+            title=title,
+            course_id=course_id
         )
         db.add(quiz)
-        await db.commit()
+        await db.flush()
         await db.refresh(quiz)
+        return quiz
 
-        # Créer questions + options
-        for q in quiz_data.questions:
-            question = QuizQuestion(
-                quiz_id=quiz.id,
-                question=q.question
-            )
-            db.add(question)
-            await db.flush()  # pour récupérer question.id
-
-            for opt in q.options:
-                option = QuizOption(
-                    question_id=question.id,
-                    text=opt.text,
-                    is_correct=opt.is_correct
-                )
-                db.add(option)
+    async def _insert_questions(self, db: AsyncSession, quiz_id: int, questions: list[QuizQuestionCreate]) -> int:
+        """
+        Insère un lot de questions puis toutes leurs options :
+        deux requêtes multi-lignes quel que soit le nombre de questions.
+        """
+        if not questions:
+            return 0
+
+        question_res = await db.execute(
+            insert(QuizQuestion).returning(QuizQuestion.id, sort_by_parameter_order=True),
+            [{"quiz_id": quiz_id, "question": q.question} for q in questions]
+        )
+        question_ids = question_res.scalars().all()
+
+        option_rows = [
+            {"question_id": question_id, "text": opt.text, "is_correct": opt.is_correct}
+            for question_id, q in zip(question_ids, questions)
+            for opt in q.options
+        ]
+        if option_rows:
+            await db.execute(insert(QuizOption), option_rows)
+
+        return len(question_ids)
+
+    async def create_quiz(self, db: AsyncSession, quiz_data: QuizCreate, user_id: int, user_role: RoleEnum):
+        await self._get_authorized_course(db, quiz_data.course_id, user_id, user_role)
+
+        # Quiz + questions + options dans une seule transaction
+        quiz = await self._new_quiz(db, quiz_data.title, quiz_data.course_id)
+        await self._insert_questions(db, quiz.id, quiz_data.questions)
 
         await db.commit()
+        invalidate_quiz(quiz.id)
         return quiz
 
+    async def import_quiz(
+        self,
+        db: AsyncSession,
+        title: str,
+        course_id: int,
+        question_batches: AsyncIterator[list[QuizQuestionCreate]],
+        user_id: int,
+        user_role: RoleEnum
+    ) -> tuple[Quiz, int]:
+        """
+        Import d'une grande banque de questions, lot par lot.
+        Tout est annulé si un lot est invalide.
+        """
+        await self._get_authorized_course(db, course_id, user_id, user_role)
+
+        try:
+            quiz = await self._new_quiz(db, title, course_id)
+            imported = 0
+            async for batch in question_batches:
+                imported += await self._insert_questions(db, quiz.id, batch)
+
+            if imported == 0:
+                raise ValueError("Quiz has no questions")
+        except Exception:
+            await db.rollback()
+            raise
+
+        await db.commit()
+        invalidate_quiz(quiz.id)
+        return quiz, imported
+
     
     async def get_quiz_by_id(self, db: AsyncSession, quiz_id: int):
         result = await db.execute(
@@ -225,6 +450,31 @@ class QuizCRUD:
         quiz = result.scalars().first()
         return quiz
 
+    async def get_quiz_snapshot(self, db: AsyncSession, quiz_id: int) -> QuizSnapshot | None:
+        snapshot = quiz_cache.get(quiz_id)
+        if snapshot is None:
+            quiz = await self.get_quiz_by_id(db, quiz_id)
+            if not quiz:
+                return None
+            snapshot = QuizSnapshot.from_quiz(quiz)
+            quiz_cache.set(quiz_id, snapshot)
+        return snapshot
+
+    async def delete_quiz(self, db: AsyncSession, quiz_id: int, user_id: int, user_role: RoleEnum):
+        quiz = await db.get(Quiz, quiz_id)
+        if not quiz:
+            return None
+
+        await self._get_authorized_course(db, quiz.course_id, user_id, user_role)
+
+        student_ids = await discount_results(db, QuizResult.quiz_id == quiz_id)
+        await db.delete(quiz)
+        await db.commit()
+        for student_id in student_ids:
+            invalidate_principal(student_id)
+        invalidate_quiz(quiz_id)
+        return quiz
+
 
     # SUBMIT QUIZ (STUDENT)
     
@@ -256,51 +506,19 @@ class QuizCRUD:
                 "can_retry": False
             }
 
-        # Charger quiz + questions + options
-        quiz_res = await db.execute(
-            select(Quiz)
-            .where(Quiz.id == quiz_id)
-            .options(
-                selectinload(Quiz.questions)
-                .selectinload(QuizQuestion.options)
-            )
-        )
-        quiz = quiz_res.scalars().first()
+        # Structure du quiz (cache, sinon quiz + questions + options)
+        snapshot = await self.get_quiz_snapshot(db, quiz_id)
 
-        if not quiz:
-            raise ValueError("Quiz not found")
+        if not snapshot:
+            raise NotFoundError("Quiz not found")
 
-        total_questions = len(quiz.questions)
+        total_questions = snapshot.total_questions
         if total_questions == 0:
             raise ValueError("Quiz has no questions")
 
 
-        # Calcul du score (SÉCURISÉ)
-        score = 0
-        answered_questions = set()
-
-        for answer in answers:
-            option_res = await db.execute(
-                select(QuizOption)
-                .join(QuizQuestion)
-                .where(
-                    QuizOption.id == answer.option_id,
-                    QuizQuestion.quiz_id == quiz_id
-                )
-            )
-            option = option_res.scalars().first()
-
-            if not option:
-                continue  # option invalide
-
-            question_id = option.question_id
-            if question_id in answered_questions:
-                continue  # déjà répondu
-
-            answered_questions.add(question_id)
-
-            if option.is_correct:
-                score += 1
+        # Calcul du score (SÉCURISÉ) : aucune requête, tout est dans le snapshot
+        score = grade_answers(snapshot, answers)
 
         percentage = round((score / total_questions) * 100, 2)
         passed = percentage >= PASS_SCORE
@@ -315,10 +533,18 @@ class QuizCRUD:
             passed=passed
         )
         db.add(quiz_result)
-        await db.commit()
 
-        # Mettre à jour le niveau utilisateur
-        await self.update_user_level(db, user_id)
+        # Mettre à jour les agrégats et le niveau dans la même transaction
+        try:
+            await self.record_result_stats(db, user_id, percentage)
+            await db.commit()
+        except IntegrityError:
+            # Quiz supprimé depuis la mise en cache de son snapshot (par un autre worker) :
+            # la clé étrangère de quiz_results refuse le résultat
+            await db.rollback()
+            invalidate_quiz(quiz_id)
+            raise NotFoundError("Quiz not found")
+        invalidate_principal(user_id)
 
         return {
             "score": score,
@@ -330,16 +556,36 @@ class QuizCRUD:
 
     # UPDATE USER LEVEL
 
-    async def update_user_level(self, db: AsyncSession, user_id: int):
-        res = await db.execute(
-            select(QuizResult).where(QuizResult.user_id == user_id)
+    async def record_result_stats(self, db: AsyncSession, user_id: int, percentage: float):
+        """
+        Ajoute un résultat aux agrégats de l'utilisateur (somme, nombre)
+        puis recalcule son niveau en O(1). Ne commit pas.
+        """
+        # Upsert : deux premières soumissions simultanées ne peuvent pas insérer deux fois la ligne
+        stmt = upsert_insert(db, UserQuizStats).values(
+            user_id=user_id, percentage_sum=percentage, results_count=1, updated_at=datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserQuizStats.user_id],
+            set_={
+                "percentage_sum": UserQuizStats.percentage_sum + stmt.excluded.percentage_sum,
+                "results_count": UserQuizStats.results_count + 1,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ).returning(UserQuizStats.percentage_sum, UserQuizStats.results_count)
+        percentage_sum, results_count = (await db.execute(stmt)).one()
+
+        await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(level=level_for_average(percentage_sum / results_count))
         )
-        results = res.scalars().all()
 
-        if not results:
-            return
+    async def update_user_level(self, db: AsyncSession, user_id: int):
+        stats = await db.get(UserQuizStats, user_id)
 
-        avg = sum(r.percentage for r in results) / len(results)
+        if not stats or not stats.results_count:
+            return
 
         user_res = await db.execute(
             select(User).where(User.id == user_id)
@@ -349,15 +595,78 @@ class QuizCRUD:
         if not user:
             return
 
-        if avg >= 80:
-            user.level = "advanced"
-        elif avg >= 50:
-            user.level = "intermediate"
-        else:
-            user.level = "beginner"
+        user.level = level_for_average(stats.percentage_sum / stats.results_count)
         await db.commit()
+        invalidate_principal(user_id)
 
 quiz_crud = QuizCRUD()
 
 
+class DashboardCRUD:
+
+    async def aggregate_counts(self, db: AsyncSession) -> dict[str, int]:
+        """Tous les totaux en une requête ; la table users n'est parcourue qu'une fois."""
+        users = select(
+            func.count(User.id).label("total_users"),
+            func.count(case((User.role == RoleEnum.student, 1))).label("total_students"),
+            func.count(case((User.role == RoleEnum.teacher, 1))).label("total_teachers"),
+        ).subquery()
+
+        row = (await db.execute(
+            select(
+                users.c.total_users,
+                users.c.total_students,
+                users.c.total_teachers,
+                select(func.count(Course.id)).scalar_subquery().label("total_courses"),
+                select(func.count(PDF.id)).scalar_subquery().label("total_pdfs"),
+                select(func.count(Enrollment.id)).scalar_subquery().label("total_enrollments"),
+            )
+        )).one()
+        return dict(row._mapping)
+
+    async def refresh_counters(self, db: AsyncSession) -> dict[str, int]:
+        """
+        (Re)calcule la table dashboard_counters à partir des tables, sans perdre de delta :
+        1. lignes créées à 0 si absentes (transaction validée à part : les deltas des
+           écritures suivantes s'y appliquent) ;
+        2. lignes verrouillées (FOR UPDATE), agrégat, valeurs écrites, dans une même transaction.
+        Une écriture concurrente attend le verrou pour appliquer son delta, après notre commit
+        (elle n'est pas dans l'agrégat) ; deux initialisations simultanées s'attendent.
+        """
+        await db.execute(
+            upsert_insert(db, DashboardCounter)
+            .values([{"name": name, "value": 0} for name in COUNTER_NAMES])
+            .on_conflict_do_nothing(index_elements=[DashboardCounter.name])
+        )
+        await db.commit()
+
+        await db.execute(select(DashboardCounter.name).with_for_update())
+        counts = await self.aggregate_counts(db)
+        await db.execute(
+            update(DashboardCounter),
+            [{"name": name, "value": value} for name, value in counts.items()]
+        )
+        await db.commit()
+        dashboard_cache.clear()
+        return counts
+
+    async def get_counts(self, db: AsyncSession) -> dict[str, int]:
+        counts = dashboard_cache.get("counts")
+        if counts is not None:
+            return counts
+
+        if DASHBOARD_MODE == "counters":
+            rows = await db.execute(select(DashboardCounter.name, DashboardCounter.value))
+            counts = {name: value for name, value in rows.all()}
+            if any(name not in counts for name in COUNTER_NAMES):
+                # Première utilisation : table vide, initialisée sur la base principale
+                # (db peut être une session de réplica)
+                async with AsyncSessionLocal() as primary:
+                    counts = await self.refresh_counters(primary)
+        else:
+            counts = await self.aggregate_counts(db)
+
+        dashboard_cache.set("counts", counts)
+        return counts
 
+dashboard_crud = DashboardCRUD()
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import delete, func, insert, literal, select, update
+
+from app.chatbot.bm25_index import invalidate_bm25
+from app.chatbot.answer_cache import invalidate_course_answers
+from app.chatbot.vector_index import add_to_course_index, remove_from_course_index
+from app.db.database import AsyncSessionLocal
+from app.models.pdf import PDF, PDFChunk, PDFStatusEnum
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = int(os.getenv("PDF_CHUNK_SIZE", "1000"))  # en caractères
+CHUNK_OVERLAP = int(os.getenv("PDF_CHUNK_OVERLAP", "200"))
+EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", "2"))
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# ---------- Exécuté dans les processus du pool ----------
+
+def extract_pages(path: str) -> list[str]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def chunk_pages(pages: list[str], size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[dict]:
+    """
+    Découpe le texte des pages en morceaux de `size` caractères qui se chevauchent de `overlap`.
+    Chaque morceau garde ses pages de début/fin (à partir de 1) et son offset dans la page de début.
+    """
+    page_offsets = []
+    offset = 0
+    for page in pages:
+        page_offsets.append(offset)
+        offset += len(page) + 1
+    text = "\n".join(pages)
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            # couper sur un espace plutôt qu'au milieu d'un mot
+            cut = text.rfind(" ", start + size // 2, end)
+            if cut != -1:
+                end = cut
+
+        piece = text[start:end].strip()
+        if piece:
+            first_page = bisect_right(page_offsets, start) - 1
+            last_page = bisect_right(page_offsets, end - 1) - 1
+            chunks.append({
+                "chunk_index": len(chunks),
+                "page_start": first_page + 1,
+                "page_end": last_page + 1,
+                "char_start": start - page_offsets[first_page],
+                "text": piece,
+            })
+
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+
+    return chunks
+
+
+def extract_chunks(path: str, size: int, overlap: int) -> tuple[int, list[dict]]:
+    pages = extract_pages(path)
+    return len(pages), chunk_pages(pages, size, overlap)
+
+
+# ---------- Tâche de fond ----------
+
+async def _copy_chunks_from_duplicate(db, pdf: PDF) -> bool:
+    """Réutilise les morceaux d'un PDF au contenu identique déjà traité."""
+    if not pdf.content_hash:
+        return False
+
+    source = await db.scalar(
+        select(PDF).where(
+            PDF.content_hash == pdf.content_hash,
+            PDF.status == PDFStatusEnum.ready,
+            PDF.id != pdf.id
+        ).limit(1)
+    )
+    if source is None:
+        return False
+
+    await db.execute(
+        insert(PDFChunk).from_select(
+            ["pdf_id", "course_id", "chunk_index", "page_start", "page_end", "char_start", "text"],
+            select(
+                literal(pdf.id), literal(pdf.course_id), PDFChunk.chunk_index, PDFChunk.page_start,
+                PDFChunk.page_end, PDFChunk.char_start, PDFChunk.text
+            ).where(PDFChunk.pdf_id == source.id)
+        )
+    )
+    pdf.page_count = source.page_count
+    return True
+
+
+async def _mark_failed(db, pdf_id: int):
+    # Après rollback, l'objet PDF est expiré : mise à jour directe, sans laisser
+    # une seconde erreur en base s'échapper de la tâche de fond
+    try:
+        await db.rollback()
+        await db.execute(update(PDF).where(PDF.id == pdf_id).values(status=PDFStatusEnum.failed))
+        await db.commit()
+    except Exception:
+        logger.exception("Could not mark pdf_id=%s as failed", pdf_id)
+
+
+async def process_pdf(pdf_id: int):
+    """
+    Extraction du texte page par page (pool de processus), découpage et stockage des morceaux.
+    Lancée après l'upload ; le statut du PDF suit l'avancement.
+    """
+    async with AsyncSessionLocal() as db:
+        pdf = await db.get(PDF, pdf_id)
+        if not pdf:
+            return
+
+        pdf.status = PDFStatusEnum.processing
+        await db.commit()
+
+        try:
+            await db.execute(delete(PDFChunk).where(PDFChunk.pdf_id == pdf_id))
+
+            if not await _copy_chunks_from_duplicate(db, pdf):
+                loop = asyncio.get_running_loop()
+                page_count, chunks = await loop.run_in_executor(
+                    get_executor(), extract_chunks, pdf.file_path, CHUNK_SIZE, CHUNK_OVERLAP
+                )
+                if chunks:
+                    await db.execute(
+                        insert(PDFChunk),
+                        [{"pdf_id": pdf.id, "course_id": pdf.course_id, **chunk} for chunk in chunks]
+                    )
+                pdf.page_count = page_count
+
+            pdf.status = PDFStatusEnum.ready
+            await db.commit()
+        except Exception:
+            logger.exception("PDF extraction failed for pdf_id=%s", pdf_id)
+            await _mark_failed(db, pdf_id)
+            return
+
+        try:
+            await index_pdf(db, pdf.id, pdf.course_id)
+        except Exception:
+            logger.exception("PDF indexing failed for pdf_id=%s", pdf_id)
+
+
+# PDF jamais traités (envoyés avant l'extraction en tâche de fond : « pending » depuis la
+# migration 2) ou interrompus par l'arrêt d'un worker (restés « processing »)
+UNPROCESSED = (PDFStatusEnum.pending, PDFStatusEnum.processing)
+
+
+async def count_unprocessed() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count(PDF.id)).where(PDF.status.in_(UNPROCESSED)))
+
+
+async def reprocess_pdfs(statuses=UNPROCESSED) -> int:
+    """Relance process_pdf, un PDF après l'autre, pour les PDF dans ces statuts."""
+    async with AsyncSessionLocal() as db:
+        pdf_ids = (await db.scalars(
+            select(PDF.id).where(PDF.status.in_(statuses)).order_by(PDF.id)
+        )).all()
+
+    for pdf_id in pdf_ids:
+        await process_pdf(pdf_id)
+    return len(pdf_ids)
+
+
+async def index_pdf(db, pdf_id: int, course_id: int):
+    """(Ré)indexe les morceaux d'un PDF dans l'index vectoriel de son cours."""
+    rows = (await db.execute(
+        select(PDFChunk.id, PDFChunk.text)
+        .where(PDFChunk.pdf_id == pdf_id)
+        .order_by(PDFChunk.chunk_index)
+    )).all()
+
+    chunk_ids = [row.id for row in rows]
+    texts = [row.text for row in rows]
+
+    def reindex():
+        remove_from_course_index(course_id, pdf_id)
+        add_to_course_index(course_id, pdf_id, chunk_ids, texts)
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, reindex)
+
+    # Index BM25 : reconstruit à la prochaine question (un ajout incrémental pourrait doubler
+    # des morceaux déjà lus en base par une question posée depuis le commit)
+    invalidate_bm25(course_id)
+
+    # Le contenu du cours a changé : les réponses déjà données ne sont plus fiables
+    invalidate_course_answers(course_id)
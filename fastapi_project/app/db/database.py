@@ -1,16 +1,74 @@
 # app/db/database.py
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from uuid import uuid4
+import itertools
 import os
 
+from app.db.pool_metrics import MeteredQueuePool, pool_gauges, pool_metrics
+from app.db.query_stats import track_queries
+from app.db.read_routing import reads_from_primary, track_writes
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Réplicas en lecture, séparées par des virgules ; vide : toutes les lectures sur DATABASE_URL
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+# Journal des requêtes SQL : désactivé par défaut (DB_ECHO=1 pour le développement)
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+
+# Pool de connexions (par processus)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # secondes, -1 : jamais
+
+# asyncpg : cache des requêtes préparées par connexion ; 0 le désactive
+# (obligatoire derrière PgBouncer en mode transaction)
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "100"))
+
+
+def engine_options(url: str) -> dict:
+    options = {"echo": DB_ECHO, "future": True}
+    url = make_url(url)
+
+    # SQLite en mémoire : connexion unique (StaticPool), pas de réglages de pool
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+
+    options.update(
+        poolclass=MeteredQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+
+    if url.get_driver_name() == "asyncpg":
+        connect_args = {"prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE_SIZE}
+        if DB_PREPARED_STATEMENT_CACHE_SIZE == 0:
+            # Noms uniques : une requête préparée ne doit pas survivre au changement de connexion serveur
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+        options["connect_args"] = connect_args
+
+    return options
 
 
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+track_writes(engine.sync_engine)
+track_queries(engine.sync_engine)
+
+replica_engines = [create_async_engine(url, **engine_options(url)) for url in DATABASE_REPLICA_URLS]
+for replica in replica_engines:
+    track_queries(replica.sync_engine)
+_replica_turn = itertools.cycle(replica_engines)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -18,6 +76,11 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
+ReadSessionLocal = sessionmaker(
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 async def get_db():
@@ -25,8 +88,24 @@ async def get_db():
         yield session
 
 
-async def init_db():
-    from app.models.user import User
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        
\ No newline at end of file
+async def get_read_db():
+    """
+    Session pour les routes en lecture seule : une réplica (à tour de rôle),
+    ou la base principale si le client vient d'écrire (voir app/db/read_routing.py).
+    """
+    if not replica_engines or reads_from_primary():
+        async with AsyncSessionLocal() as session:
+            yield session
+        return
+
+    async with ReadSessionLocal(bind=next(_replica_turn)) as session:
+        yield session
+
+
+def pool_stats() -> dict:
+    """Métriques du pool : connexions occupées, débordement, attente au checkout."""
+    stats = pool_metrics.stats(engine.pool)
+    if replica_engines:
+        # L'attente au checkout est cumulée sur tous les engines du processus
+        stats["replicas"] = [pool_gauges(replica.pool) for replica in replica_engines]
+    return stats
@@ -0,0 +1,377 @@
+import logging
+import os
+from typing import Awaitable, Callable
+
+from sqlalchemy import (
+    BigInteger, Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, MetaData, String, Table, Text,
+    func, insert, inspect, select, text,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Migrations versionnées du schéma, appliquées uniquement par `python migrate.py`.
+# Au démarrage, l'application se contente de vérifier la version (check_schema_version).
+#
+# Chaque migration est idempotente (IF NOT EXISTS, colonnes vérifiées avant ajout) :
+# une base créée avant ce système part de la version 0 et rejoue toute la liste sans risque.
+# Les migrations « online » tournent hors transaction pour construire les index
+# avec CREATE INDEX CONCURRENTLY (PostgreSQL) sans bloquer les écritures.
+
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+
+# Verrou consultatif PostgreSQL : un seul `migrate` à la fois
+MIGRATION_ADVISORY_LOCK = 7_214_001
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+class Migration:
+    def __init__(self, version: int, name: str, upgrade: Callable[[AsyncConnection], Awaitable[None]], online: bool):
+        self.version = version
+        self.name = name
+        self.upgrade = upgrade
+        self.online = online
+
+    def __repr__(self):
+        return f"<Migration {self.version:04d} {self.name}>"
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, name: str, online: bool = False):
+    """Enregistre une migration ; online=True : exécutée en autocommit (index concurrents)."""
+    def register(upgrade):
+        if MIGRATIONS and version != MIGRATIONS[-1].version + 1:
+            raise RuntimeError(f"Migration {version} registered out of order")
+        MIGRATIONS.append(Migration(version, name, upgrade, online))
+        return upgrade
+    return register
+
+
+def head_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+# ---------- Opérations ----------
+
+def _postgres(conn: AsyncConnection) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+async def has_column(conn: AsyncConnection, table: str, column: str) -> bool:
+    columns = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_columns(table))
+    return any(c["name"] == column for c in columns)
+
+
+async def add_column(conn: AsyncConnection, table: str, column: str, ddl: str):
+    """
+    ALTER TABLE ... ADD COLUMN si absente. Sur PostgreSQL, une colonne nullable ou
+    avec un DEFAULT constant ne réécrit pas la table (modification du catalogue seulement).
+    """
+    if not await has_column(conn, table, column):
+        await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+async def create_table(conn: AsyncConnection, table: Table):
+    await conn.run_sync(lambda sync_conn: table.create(sync_conn, checkfirst=True))
+
+
+async def create_index(conn: AsyncConnection, name: str, table: str, columns: str, unique: bool = False):
+    """
+    CREATE INDEX IF NOT EXISTS ; CONCURRENTLY sur PostgreSQL (migration online uniquement).
+    Un index laissé invalide par une construction concurrente interrompue est reconstruit.
+    """
+    concurrently = ""
+    if _postgres(conn):
+        concurrently = "CONCURRENTLY "
+        valid = await conn.scalar(text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+        ), {"name": name})
+        if valid is False:
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    await conn.execute(text(f"CREATE {kind} {concurrently}IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+# ---------- Versions ----------
+
+# Tables figées telles que chaque migration les crée, indépendantes des modèles :
+# une colonne ou un index ajouté plus tard aux modèles doit passer par une nouvelle migration.
+frozen = MetaData()
+
+# Version 1 : schéma d'origine (avant les migrations versionnées)
+users_v1 = Table(
+    "users", frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(50), unique=True, nullable=False, index=True),
+    Column("email", String(150), unique=True, nullable=False, index=True),
+    Column("password", String(255), nullable=False),
+    Column("is_active", Boolean, nullable=False),
+    Column("role", Enum("student", "teacher", "admin", name="roleenum", native_enum=False), nullable=False),
+    Column("level", Enum("beginner", "intermediate", "advanced", name="levelenum", native_enum=False), nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+courses_v1 = Table(
+    "courses", frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(200), nullable=False, index=True),
+    Column("description", Text, nullable=True),
+    Column("is_published", Boolean, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Column("teacher_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+)
+
+pdfs_v1 = Table(
+    "pdfs", frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(255), nullable=False),
+    Column("file_path", String, nullable=False),
+    Column("uploaded_at", DateTime),
+    Column("course_id", Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False),
+)
+
+enrollments_v1 = Table(
+    "enrollments", frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("student_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("course_id", Integer, ForeignKey("courses.id"), nullable=False),
+    Column("enrolled_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+quizzes_v1 = Table(
+    "quizzes", frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(255), nullable=False),
+    Column("course_id", Integer, ForeignKey("courses.id", ondelete="CASCADE")),
+    Column("created_at", DateTime),
+)
+
+quiz_questions_v1 = Table(
+    "quiz_questions", frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("quiz_id", Integer, ForeignKey("quizzes.id", ondelete="CASCADE")),
+    Column("question", String, nullable=False),
+)
+
+quiz_options_v1 = Table(
+    "quiz_options", frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("question_id", Integer, ForeignKey("quiz_questions.id", ondelete="CASCADE")),
+    Column("text", String, nullable=False),
+    Column("is_correct", Boolean),
+)
+
+quiz_results_v1 = Table(
+    "quiz_results", frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE")),
+    Column("quiz_id", Integer, ForeignKey("quizzes.id", ondelete="CASCADE")),
+    Column("score", Integer, nullable=False),
+    Column("total", Integer, nullable=False),
+    Column("percentage", Float, nullable=False),
+    Column("passed", Boolean),
+    Column("taken_at", DateTime),
+)
+
+# Version 2
+pdf_chunks_v2 = Table(
+    "pdf_chunks", frozen,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("pdf_id", Integer, ForeignKey("pdfs.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("course_id", Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("chunk_index", Integer, nullable=False),
+    Column("page_start", Integer, nullable=False),
+    Column("page_end", Integer, nullable=False),
+    Column("char_start", Integer, nullable=False),
+    Column("text", Text, nullable=False),
+)
+
+# Version 3
+user_quiz_stats_v3 = Table(
+    "user_quiz_stats", frozen,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("percentage_sum", Float, nullable=False),
+    Column("results_count", Integer, nullable=False),
+    Column("updated_at", DateTime),
+)
+
+# Version 4
+dashboard_counters_v4 = Table(
+    "dashboard_counters", frozen,
+    Column("name", String(50), primary_key=True),
+    Column("value", BigInteger, nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+@migration(1, "initial schema")
+async def initial_schema(conn: AsyncConnection):
+    for table in (users_v1, courses_v1, pdfs_v1, enrollments_v1, quizzes_v1, quiz_questions_v1, quiz_options_v1, quiz_results_v1):
+        await create_table(conn, table)
+
+
+@migration(2, "pdf storage columns and chunks")
+async def pdf_storage(conn: AsyncConnection):
+    await add_column(conn, "pdfs", "content_hash", "VARCHAR(64)")
+    await add_column(conn, "pdfs", "size_bytes", "INTEGER")
+    # Les PDF existants restent « pending » : aucun morceau extrait
+    await add_column(conn, "pdfs", "status", "VARCHAR(10) NOT NULL DEFAULT 'pending'")
+    await add_column(conn, "pdfs", "page_count", "INTEGER")
+    await create_table(conn, pdf_chunks_v2)
+
+
+@migration(3, "user quiz stats")
+async def user_quiz_stats(conn: AsyncConnection):
+    stats, results = user_quiz_stats_v3, quiz_results_v1
+
+    await create_table(conn, stats)
+    if await conn.scalar(select(func.count()).select_from(stats)):
+        return
+    # Remplissage initial depuis l'historique (voir aussi backfill_user_stats.py)
+    await conn.execute(
+        insert(stats).from_select(
+            ["user_id", "percentage_sum", "results_count", "updated_at"],
+            select(
+                results.c.user_id,
+                func.sum(results.c.percentage),
+                func.count(results.c.id),
+                func.max(results.c.taken_at),
+            )
+            .where(results.c.user_id.is_not(None))
+            .group_by(results.c.user_id)
+        )
+    )
+
+
+@migration(4, "dashboard counters")
+async def dashboard_counters(conn: AsyncConnection):
+    # Table vide : initialisée à la première lecture en mode counters
+    await create_table(conn, dashboard_counters_v4)
+
+
+@migration(5, "hot path indexes", online=True)
+async def hot_path_indexes(conn: AsyncConnection):
+    await create_index(conn, "ix_pdfs_content_hash", "pdfs", "content_hash")
+    await create_index(conn, "ix_users_created_at_id", "users", "created_at, id")
+    await create_index(conn, "ix_courses_created_at_id", "courses", "created_at, id")
+    await create_index(conn, "ix_pdfs_course_id_uploaded_at_id", "pdfs", "course_id, uploaded_at, id")
+    await create_index(conn, "ix_quizzes_course_id", "quizzes", "course_id")
+    await create_index(conn, "ix_quiz_questions_quiz_id", "quiz_questions", "quiz_id")
+    await create_index(conn, "ix_quiz_options_question_id", "quiz_options", "question_id")
+    await create_index(conn, "ix_quiz_results_user_quiz_passed", "quiz_results", "user_id, quiz_id, passed")
+    await create_index(conn, "ix_enrollments_course_id", "enrollments", "course_id")
+
+
+@migration(6, "unique enrollments", online=True)
+async def unique_enrollments(conn: AsyncConnection):
+    uniques = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_unique_constraints("enrollments"))
+    if any(u["column_names"] == ["student_id", "course_id"] for u in uniques):
+        return  # base créée par create_all avant les migrations, contrainte déjà là
+
+    # Doublons créés par les doubles clics : on garde la première inscription
+    await conn.execute(text(
+        "DELETE FROM enrollments WHERE id NOT IN ("
+        "SELECT MIN(id) FROM enrollments GROUP BY student_id, course_id)"
+    ))
+    await create_index(conn, "uq_enrollments_student_course", "enrollments", "student_id, course_id", unique=True)
+
+    if _postgres(conn):
+        # La contrainte reprend l'index déjà construit : pas de second parcours de la table
+        exists = await conn.scalar(text(
+            "SELECT 1 FROM pg_constraint WHERE conname = 'uq_enrollments_student_course'"
+        ))
+        if not exists:
+            await conn.execute(text(
+                "ALTER TABLE enrollments ADD CONSTRAINT uq_enrollments_student_course "
+                "UNIQUE USING INDEX uq_enrollments_student_course"
+            ))
+
+
+# ---------- Exécution ----------
+
+async def current_version(conn: AsyncConnection) -> int:
+    """Version appliquée ; 0 si la table schema_version n'existe pas encore."""
+    if not await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table(schema_version.name)):
+        return 0
+    return await conn.scalar(select(func.coalesce(func.max(schema_version.c.version), 0)))
+
+
+async def _set_lock_timeout(conn: AsyncConnection):
+    # Un ALTER en attente de verrou bloque toutes les requêtes derrière lui : on abandonne vite
+    if _postgres(conn):
+        await conn.execute(text(f"SET lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'"))
+
+
+async def _apply(db_engine: AsyncEngine, step: Migration):
+    stamp = insert(schema_version).values(version=step.version, name=step.name)
+
+    if not step.online:
+        # Migration et numéro de version dans la même transaction
+        async with db_engine.begin() as conn:
+            await _set_lock_timeout(conn)
+            await step.upgrade(conn)
+            await conn.execute(stamp)
+        return
+
+    async with db_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await _set_lock_timeout(conn)
+        try:
+            await step.upgrade(conn)
+            await conn.execute(stamp)
+        finally:
+            if _postgres(conn):
+                await conn.execute(text("RESET lock_timeout"))
+
+
+async def migrate(db_engine: AsyncEngine = engine, target: int | None = None) -> list[Migration]:
+    """Applique les migrations en attente jusqu'à target (par défaut la dernière). Renvoie celles appliquées."""
+    target = head_version() if target is None else target
+    applied = []
+
+    async with db_engine.connect() as lock_conn:
+        if _postgres(lock_conn):
+            await lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_ADVISORY_LOCK})
+        try:
+            async with db_engine.begin() as conn:
+                await conn.run_sync(lambda sync_conn: schema_version.create(sync_conn, checkfirst=True))
+                version = await current_version(conn)
+
+            for step in MIGRATIONS:
+                if version < step.version <= target:
+                    logger.info("Applying migration %s", step)
+                    await _apply(db_engine, step)
+                    applied.append(step)
+        finally:
+            if _postgres(lock_conn):
+                await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_ADVISORY_LOCK})
+
+    return applied
+
+
+async def check_schema_version(db_engine: AsyncEngine = engine):
+    """Au démarrage : une requête, pas de DDL. RuntimeError si des migrations sont en attente."""
+    async with db_engine.connect() as conn:
+        version = await current_version(conn)
+
+    head = head_version()
+    if version < head:
+        raise RuntimeError(
+            f"Database schema is at version {version}, expected {head}: run `python migrate.py`"
+        )
+    if version > head:
+        logger.warning("Database schema version %s is newer than this code (%s)", version, head)
@@ -0,0 +1,77 @@
+import time
+from collections import deque
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+def _percentile_ms(values: deque, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000, 3)
+
+
+class PoolMetrics:
+    """Attente au checkout (fenêtre glissante) et compteurs cumulés du pool de connexions."""
+
+    def __init__(self, window: int = 1024):
+        self._waits: deque = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self._waits.clear()
+
+    def observe_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self._waits.append(seconds)
+
+    def stats(self, pool: Pool) -> dict:
+        return {
+            "pool": type(pool).__name__,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_p50_ms": _percentile_ms(self._waits, 50),
+            "wait_p99_ms": _percentile_ms(self._waits, 99),
+            "wait_max_ms": round(max(self._waits, default=0.0) * 1000, 3),
+            **pool_gauges(pool),
+        }
+
+
+def pool_gauges(pool: Pool) -> dict:
+    """État instantané d'un pool à file (vide pour les autres pools)."""
+    if not isinstance(pool, QueuePool):
+        return {}
+    return {
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # Négatif tant que le pool n'a pas ouvert ses pool_size connexions
+        "overflow": pool.overflow(),
+    }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """
+    Pool de l'engine async qui mesure le temps de checkout : attente d'une connexion libre,
+    ouverture d'une connexion de débordement et pre-ping compris.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.observe_wait(time.perf_counter() - started)
+        return connection
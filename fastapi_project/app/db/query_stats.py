@@ -0,0 +1,155 @@
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Requêtes SQL par requête HTTP : nombre, temps passé en base, formes répétées (N+1).
+# Le résultat part dans l'en-tête Server-Timing (visible dans l'onglet réseau du navigateur) ;
+# query_budget() sert aux tests et benchmarks pour échouer au-delà d'un nombre de requêtes.
+
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "1") == "1"
+# Même forme de requête exécutée au moins N fois dans une requête HTTP : N+1 probable
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+
+# Listes IN (?, ?, ?) / ($1, $2) de longueur variable : même forme quelle que soit la taille
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|\$\d+|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|\$\d+|%\(\w+\)s|:\w+)\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    return _SPACES.sub(" ", _IN_LIST.sub("(?)", statement)).strip()
+
+
+class QueryStats:
+    """Compteurs d'un périmètre (requête HTTP ou bloc query_budget)."""
+
+    __slots__ = ("count", "db_seconds", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.db_seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def repeated(self, threshold: int = QUERY_REPEAT_THRESHOLD) -> dict[str, int]:
+        return {shape: n for shape, n in self.shapes.items() if n >= threshold}
+
+
+# Périmètres actifs, du plus externe au plus interne : chaque requête SQL les incrémente tous
+_active: ContextVar[tuple[QueryStats, ...]] = ContextVar("query_stats", default=())
+
+
+@contextmanager
+def collect_queries():
+    stats = QueryStats()
+    token = _active.set((*_active.get(), stats))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get():
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    scopes = _active.get()
+    if not scopes:
+        return
+    started = conn.info.get("query_started")
+    elapsed = time.perf_counter() - started.pop() if started else 0.0
+    shape = statement_shape(statement)
+    for stats in scopes:
+        stats.count += 1
+        stats.db_seconds += elapsed
+        stats.shapes[shape] += 1
+
+
+def _on_error(context):
+    # Requête en échec : pas d'after_cursor_execute, on dépile le départ
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def track_queries(sync_engine: Engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_execute)
+    event.listen(sync_engine, "handle_error", _on_error)
+
+
+def server_timing(stats: QueryStats, total_seconds: float) -> str:
+    return (
+        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.count} queries", '
+        f"app;dur={total_seconds * 1000:.2f}"
+    )
+
+
+class QueryStatsMiddleware:
+    """
+    Middleware ASGI : compte les requêtes SQL de chaque requête HTTP, ajoute Server-Timing
+    et journalise les formes répétées (N+1) avec le gabarit de la route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        with collect_queries() as stats:
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    header = server_timing(stats, time.perf_counter() - started)
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+        for shape, n in stats.repeated().items():
+            route = scope.get("route")
+            logger.warning(
+                "Possible N+1 on %s %s: %d x %s",
+                scope["method"], getattr(route, "path", scope["path"]), n, shape[:200],
+            )
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Trop de requêtes SQL (ou une forme trop répétée) dans un bloc query_budget."""
+
+
+@contextmanager
+def query_budget(max_queries: int, max_repeats: int | None = None):
+    """
+    Échoue (QueryBudgetExceeded) si le bloc envoie plus de max_queries requêtes,
+    ou répète une même forme plus de max_repeats fois. Couvre aussi les appels ASGI en
+    processus (httpx.ASGITransport), exécutés dans le contexte de l'appelant.
+
+        with query_budget(4):
+            await client.get("/courses/")
+    """
+    with collect_queries() as stats:
+        yield stats
+
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{stats.count} queries, budget {max_queries}: "
+            + "; ".join(f"{n} x {shape[:120]}" for shape, n in stats.shapes.most_common(3))
+        )
+    if max_repeats is not None:
+        shape, n = max(stats.shapes.items(), key=lambda item: item[1], default=("", 0))
+        if n > max_repeats:
+            raise QueryBudgetExceeded(f"{n} x {shape[:200]} (max {max_repeats} repeats)")
@@ -0,0 +1,87 @@
+import os
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Lecture de ses propres écritures avec des réplicas asynchrones : après une écriture,
+# les lectures du même client passent par la base principale pendant DB_REPLICA_STICKY_SECONDS
+# (délai de réplication toléré). Le client est suivi par un cookie posé sur la réponse
+# de la requête qui écrit ; dans cette même requête, les lectures suivantes vont aussi au primaire.
+
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+STICKY_COOKIE = "db_primary_until"
+
+
+class RequestDBState:
+    """État partagé par une requête : objet mutable, visible de la tâche qui exécute la route."""
+
+    __slots__ = ("primary_until", "wrote")
+
+    def __init__(self, primary_until: float = 0.0):
+        self.primary_until = primary_until
+        self.wrote = False
+
+
+_request_state: ContextVar[RequestDBState | None] = ContextVar("db_request_state", default=None)
+
+
+def reads_from_primary() -> bool:
+    state = _request_state.get()
+    return state is not None and (state.wrote or state.primary_until > time.time())
+
+
+def _on_execute(conn, cursor, statement, parameters, context, executemany):
+    # INSERT / UPDATE / DELETE (ORM ou Core) sur la base principale
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+
+
+def track_writes(primary: Engine):
+    event.listen(primary, "before_cursor_execute", _on_execute)
+
+
+def _cookie_until(headers: list[tuple[bytes, bytes]]) -> float:
+    for name, value in headers:
+        if name == b"cookie":
+            cookie = SimpleCookie()
+            try:
+                cookie.load(value.decode("latin-1"))
+                return float(cookie[STICKY_COOKIE].value)
+            except (KeyError, ValueError):
+                return 0.0
+    return 0.0
+
+
+class ReadYourWritesMiddleware:
+    """Middleware ASGI : lit le cookie de fenêtre « primaire », le repose après une écriture."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = RequestDBState(_cookie_until(scope["headers"]))
+        token = _request_state.set(state)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and state.wrote:
+                until = time.time() + DB_REPLICA_STICKY_SECONDS
+                cookie = (
+                    f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(DB_REPLICA_STICKY_SECONDS) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_state.reset(token)
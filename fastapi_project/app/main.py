@@ -1,9 +1,29 @@
+import asyncio
+import logging
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware 
-from app.db.database import init_db
+from app.db.database import replica_engines
+from app.db.migrations import check_schema_version
+from app.db.query_stats import QUERY_STATS_ENABLED, QueryStatsMiddleware
+from app.core.metrics import METRICS_ENABLED, METRICS_MULTIPROC_DIR, MetricsMiddleware, sample_forever
+from app.db.read_routing import ReadYourWritesMiddleware
+from app.data.pdfs.pdfs import count_unprocessed, shutdown_executor
+from app.chatbot.chat_ai import warm_up
+from app.chatbot.llm_executor import llm_executor
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.body_limit import FORM_OVERHEAD, BodySizeLimitMiddleware
 from app.routers import user_routers,courses_routers, pdf_routers, enrollment_routers, chatbot_routers, quiz_routers
 from app.api import auth
+from app.chatbot import pdf_rag
 from app.routers import admin_routers
+from app.routers import metrics_routers
+
+logger = logging.getLogger(__name__)
+
+# Préchargement du modèle au démarrage, en tâche de fond (LLM_WARMUP=1)
+LLM_WARMUP = os.getenv("LLM_WARMUP", "0") == "1"
 
 app = FastAPI(title="Smart Learning Platform")
 
@@ -12,19 +32,61 @@ origins = [
     "http://127.0.0.1:5173"   
 ]
 
+# Envoi de PDF trop gros refusé avant la réception du multipart (ajouté avant CORS :
+# la réponse 413 garde les en-têtes CORS)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={"/pdfs/upload": pdf_routers.MAX_PDF_SIZE + FORM_OVERHEAD},
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,           
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
                  
 )
 
+if replica_engines:
+    # Après une écriture, le même client relit sur la base principale (délai de réplication)
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if QUERY_STATS_ENABLED:
+    # Requêtes SQL et temps en base par requête HTTP (en-tête Server-Timing, alerte N+1)
+    app.add_middleware(QueryStatsMiddleware)
+
+if METRICS_ENABLED:
+    # Ajouté en dernier : middleware le plus externe, la latence mesurée couvre toute la pile
+    app.add_middleware(MetricsMiddleware)
+
+
+async def warm_up_llm():
+    try:
+        await llm_executor.run(warm_up)
+        logger.info("LLM warm-up done")
+    except Exception:
+        logger.warning("LLM warm-up failed", exc_info=True)
+
 
 @app.on_event("startup")
 async def on_startup():
-    await init_db()
+    # Le schéma est géré par `python migrate.py` ; ici, simple vérification de version
+    await check_schema_version()
+    unprocessed = await count_unprocessed()
+    if unprocessed:
+        # Absents de la recherche du chatbot tant qu'ils n'ont pas de morceaux
+        logger.warning("%d PDF(s) pending or interrupted: run `python reprocess_pdfs.py`", unprocessed)
+    if LLM_WARMUP:
+        # Ne retarde pas le démarrage : l'API répond pendant le chargement du modèle
+        app.state.llm_warmup = asyncio.create_task(warm_up_llm())
+    if METRICS_ENABLED and METRICS_MULTIPROC_DIR:
+        app.state.metrics_sampler = asyncio.create_task(sample_forever())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    shutdown_executor()
 
 app.include_router(auth.router)
 app.include_router(user_routers.router)
@@ -32,9 +94,13 @@ app.include_router(courses_routers.router)
 app.include_router(pdf_routers.router)
 app.include_router(enrollment_routers.router)
 app.include_router(chatbot_routers.router)
+app.include_router(pdf_rag.router)
 app.include_router(quiz_routers.router)
 app.include_router(admin_routers.router)
 
+if METRICS_ENABLED:
+    app.include_router(metrics_routers.router)
+
 
 @app.get("/")
 async def root():
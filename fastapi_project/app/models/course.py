@@ -1,5 +1,5 @@
 # app/models/course.py
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 from sqlalchemy.sql import func
@@ -23,5 +23,8 @@ class Course(Base):
     enrollments = relationship("Enrollment", back_populates="course", cascade="all, delete-orphan")
     #certificates = relationship("Certificate", back_populates="course", cascade="all, delete-orphan")
 
+    # Pagination par clé (created_at, id)
+    __table_args__ = (Index("ix_courses_created_at_id", "created_at", "id"),)
+
     def __repr__(self):
         return f"<Course id={self.id} title={self.title}>"
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, BigInteger, DateTime, func
+from app.db.database import Base
+
+
+# Compteurs du tableau de bord admin (mode DASHBOARD_MODE=counters),
+# tenus à jour à chaque flush de l'ORM (voir app/core/dashboard_counters.py)
+class DashboardCounter(Base):
+    __tablename__ = "dashboard_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
@@ -13,3 +13,9 @@ class Enrollment(Base):
     # Relationships
     student = relationship("User", back_populates="enrollments")
     course = relationship("Course", back_populates="enrollments")
+
+    # Une inscription par (étudiant, cours) ; l'index unique sert aussi les recherches par student_id
+    __table_args__ = (
+        UniqueConstraint("student_id", "course_id", name="uq_enrollments_student_course"),
+        Index("ix_enrollments_course_id", "course_id"),
+    )
@@ -1,7 +1,16 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum as SQLEnum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
+import enum
+
+
+# Avancement de l'extraction du texte
+class PDFStatusEnum(str, enum.Enum):
+    pending = "pending"
+    processing = "processing"
+    ready = "ready"
+    failed = "failed"
 
 
 class PDF(Base):
@@ -10,10 +19,38 @@ class PDF(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     file_path = Column(String, nullable=False)  # Path to the stored file
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256, nom du fichier stocké
+    size_bytes = Column(Integer, nullable=True)
+    status = Column(SQLEnum(PDFStatusEnum, native_enum=False), nullable=False, default=PDFStatusEnum.pending)
+    page_count = Column(Integer, nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
     course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
     course = relationship("Course", back_populates="pdfs")
 
+    chunks = relationship("PDFChunk", back_populates="pdf", cascade="all, delete-orphan", passive_deletes=True)
+
+    # PDF d'un cours, pagination par clé (uploaded_at, id)
+    __table_args__ = (Index("ix_pdfs_course_id_uploaded_at_id", "course_id", "uploaded_at", "id"),)
+
     def __repr__(self):
         return f"<PDF id={self.id} title={self.title} course_id={self.course_id}>"
+
+
+class PDFChunk(Base):
+    """Morceau de texte extrait d'un PDF, avec sa position (pages, offset dans la page de début)."""
+    __tablename__ = "pdf_chunks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    pdf_id = Column(Integer, ForeignKey("pdfs.id", ondelete="CASCADE"), nullable=False, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    page_start = Column(Integer, nullable=False)
+    page_end = Column(Integer, nullable=False)
+    char_start = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+
+    pdf = relationship("PDF", back_populates="chunks")
+
+    def __repr__(self):
+        return f"<PDFChunk id={self.id} pdf_id={self.pdf_id} pages={self.page_start}-{self.page_end}>"
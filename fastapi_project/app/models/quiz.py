@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
@@ -9,7 +9,7 @@ class Quiz(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
-    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"))
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     questions = relationship(
@@ -30,7 +30,7 @@ class QuizQuestion(Base):
     __tablename__ = "quiz_questions"
 
     id = Column(Integer, primary_key=True, index=True)
-    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"))
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), index=True)
     question = Column(String, nullable=False)
 
     quiz = relationship("Quiz", back_populates="questions")
@@ -47,7 +47,7 @@ class QuizOption(Base):
     __tablename__ = "quiz_options"
 
     id = Column(Integer, primary_key=True, index=True)
-    question_id = Column(Integer, ForeignKey("quiz_questions.id", ondelete="CASCADE"))
+    question_id = Column(Integer, ForeignKey("quiz_questions.id", ondelete="CASCADE"), index=True)
     text = Column(String, nullable=False)
     is_correct = Column(Boolean, default=False)
 
@@ -72,3 +72,15 @@ class QuizResult(Base):
     quiz = relationship("Quiz", back_populates="results")
     user = relationship("User", back_populates="quiz_results")
 
+    # submit_quiz : « déjà validé ? » filtre sur (user_id, quiz_id, passed)
+    __table_args__ = (Index("ix_quiz_results_user_quiz_passed", "user_id", "quiz_id", "passed"),)
+
+
+class UserQuizStats(Base):
+    """Agrégats des résultats d'un utilisateur, mis à jour à chaque soumission."""
+    __tablename__ = "user_quiz_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    percentage_sum = Column(Float, nullable=False, default=0)
+    results_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Enum as SQLEnum, DateTime, func
+from sqlalchemy import Column, Integer, String, Boolean, Enum as SQLEnum, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 import enum
@@ -35,6 +35,9 @@ class User(Base):
 
     quiz_results = relationship("QuizResult", back_populates="user", cascade="all, delete-orphan")
 
+    # Pagination par clé (created_at, id)
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
+
 
 
 
@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
 
 from app.core.permissions import allow_roles
-from app.models.user import RoleEnum, User
-from app.db.database import get_db
-from app.crud.crud import course_crud
+from app.models.user import RoleEnum, LevelEnum, User
+from app.db.database import get_db, get_read_db, pool_stats
+from app.crud.crud import course_crud, dashboard_crud, user_crud
+from app.core.pagination import MAX_PAGE_SIZE, set_next_cursor
+from app.core.cache import caches
+from app.chatbot.llm_executor import llm_executor
+from app.chatbot.single_flight import llm_flights
+from app.core.principal_cache import invalidate_principal
 from app.models.course import Course
 from app.models.pdf import PDF
-from app.models.quiz import Quiz
+from app.models.quiz import Quiz, QuizResult
+from app.core.exports import export_response
+from typing import Literal
 from app.models.enrollment import Enrollment
 from app.schemas.schemas import UserOut, AdminDashboardOut, UpdateUserRole, CourseOut, CourseAdminOut, CourseCreate
 
@@ -18,31 +25,92 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
 
 @router.get("/dashboard", response_model=AdminDashboardOut)
 async def admin_dashboard(
+    db: AsyncSession = Depends(get_read_db),
+    admin: User = Depends(allow_roles(RoleEnum.admin))
+):
+    # Une seule requête (ou la table de compteurs), resservie DASHBOARD_CACHE_TTL secondes
+    return AdminDashboardOut(**await dashboard_crud.get_counts(db))
+
+@router.post("/dashboard/recount", response_model=AdminDashboardOut)
+async def recount_dashboard(
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(allow_roles(RoleEnum.admin))
 ):
-    total_users = await db.scalar(select(func.count(User.id)))
-    total_courses = await db.scalar(select(func.count(Course.id)))
-    total_pdfs = await db.scalar(select(func.count(PDF.id)))
-    total_enrollments = await db.scalar(select(func.count(Enrollment.id)))
-    total_students = await db.scalar(select(func.count(User.id)).where(User.role == RoleEnum.student))
-    total_teachers = await db.scalar(select(func.count(User.id)).where(User.role == RoleEnum.teacher))
-
-    return AdminDashboardOut(
-        total_users=total_users,
-        total_students=total_students,
-        total_teachers=total_teachers,
-        total_courses=total_courses,
-        total_pdfs=total_pdfs,
-        total_enrollments=total_enrollments
-    )
+    """Recalcule la table de compteurs depuis les tables (après un import SQL direct, par exemple)."""
+    return AdminDashboardOut(**await dashboard_crud.refresh_counters(db))
+
+# ---------------- Exports (CSV / NDJSON en flux) ----------------
+ExportFormat = Literal["csv", "ndjson"]
+
+@router.get("/export/users")
+async def export_users(
+    format: ExportFormat = "csv",
+    admin: User = Depends(allow_roles(RoleEnum.admin))
+):
+    return export_response("users", select(
+        User.id, User.username, User.email, User.role, User.level,
+        User.is_active, User.created_at, User.updated_at,
+    ).order_by(User.id), format)
+
+@router.get("/export/enrollments")
+async def export_enrollments(
+    format: ExportFormat = "csv",
+    admin: User = Depends(allow_roles(RoleEnum.admin))
+):
+    return export_response("enrollments", select(
+        Enrollment.id, Enrollment.student_id, User.username.label("student_username"),
+        Enrollment.course_id, Course.title.label("course_title"), Enrollment.enrolled_at,
+    ).join(User, User.id == Enrollment.student_id)
+     .join(Course, Course.id == Enrollment.course_id)
+     .order_by(Enrollment.id), format)
+
+@router.get("/export/quiz-results")
+async def export_quiz_results(
+    format: ExportFormat = "csv",
+    admin: User = Depends(allow_roles(RoleEnum.admin))
+):
+    return export_response("quiz_results", select(
+        QuizResult.id, QuizResult.user_id, QuizResult.quiz_id, QuizResult.score,
+        QuizResult.total, QuizResult.percentage, QuizResult.passed, QuizResult.taken_at,
+    ).order_by(QuizResult.id), format)
+
+@router.get("/cache/stats")
+async def cache_stats(
+    admin: User = Depends(allow_roles(RoleEnum.admin))
+):
+    return {name: cache.stats() for name, cache in caches.items()}
+
+@router.get("/llm/stats")
+async def llm_stats(
+    admin: User = Depends(allow_roles(RoleEnum.admin))
+):
+    return {**llm_executor.stats(), "coalescing": llm_flights.stats()}
+
+@router.get("/db/pool")
+async def db_pool_stats(
+    admin: User = Depends(allow_roles(RoleEnum.admin))
+):
+    return pool_stats()
+
 @router.get("/users", response_model=list[UserOut])
 async def get_all_users(
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    role: RoleEnum | None = None,
+    level: LevelEnum | None = None,
+    is_active: bool | None = None,
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(allow_roles(RoleEnum.admin))
 ):
-    result = await db.execute(select(User))
-    return result.scalars().all()
+    try:
+        users, next_cursor = await user_crud.list_users(
+            db, cursor=cursor, limit=limit, role=role, level=level, is_active=is_active
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return users
 
 @router.put("/users/{user_id}/role")
 async def update_user_role(
@@ -62,6 +130,7 @@ async def update_user_role(
     #Sauvegarder en base
     await db.commit()
     await db.refresh(user)
+    invalidate_principal(user_id)
 
     return {
         "message": "User role updated successfully",
@@ -82,6 +151,7 @@ async def toggle_user_active(
     user.is_active = not user.is_active
     await db.commit()
     await db.refresh(user)
+    invalidate_principal(user_id)
 
     status = "active" if user.is_active else "inactive"
     return {"message": f"User is now {status}", "user_id": user.id, "is_active": user.is_active}
@@ -99,19 +169,28 @@ async def delete_user(
 
     await db.delete(user)
     await db.commit()
+    invalidate_principal(user_id)
 
     return {"message": "User deleted successfully", "user_id": user_id}
 
 @router.get("/courses", response_model=list[CourseAdminOut])
 async def get_all_courses(
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    teacher_id: int | None = None,
+    title: str | None = None,
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(allow_roles(RoleEnum.admin))
 ):
     # On charge le cours et son propriétaire (professeur)
-    result = await db.execute(
-        select(Course).options(selectinload(Course.owner))
-    )
-    courses = result.scalars().all()
+    try:
+        courses, next_cursor = await course_crud.list_courses(
+            db, cursor=cursor, limit=limit, teacher_id=teacher_id, title=title, with_owner=True
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
 
     # On transforme les objets en dictionnaire attendu par le schema
     return [
@@ -154,14 +233,11 @@ async def delete_course_as_admin(
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(allow_roles(RoleEnum.admin))
 ):
-    # Vérifier si le cours existe
-    course = await db.get(Course, course_id)
+    # Suppression + agrégats des résultats + invalidation des caches et index
+    course = await course_crud.delete_course(db, course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Cours non trouvé")
     
-    await db.delete(course)
-    await db.commit()
-    
     return {"message": "Cours supprimé avec succès", "course_id": course_id}
  
 ############## 
@@ -172,17 +248,18 @@ async def get_course_by_id(
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(allow_roles(RoleEnum.admin))
 ):
-    course = await db.get(Course, course_id)
+    # Propriétaire chargé avec le cours (pas de chargement paresseux en async)
+    course = await db.get(Course, course_id, options=[joinedload(Course.owner)])
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
     # PDFs du cours
-    result_pdfs = await db.execute(select(PDF).where(PDF.course_id == course_id))
-    pdfs = result_pdfs.scalars().all()
+    result_pdfs = await db.execute(select(PDF.id, PDF.title).where(PDF.course_id == course_id))
+    pdfs = result_pdfs.all()
 
-    # Quiz du cours
-    result_quiz = await db.execute(select(Quiz).where(Quiz.course_id == course_id))
-    quizzes = result_quiz.scalars().all()
+    # Quiz du cours : colonnes seules, sans les questions (chargées en selectin sur l'entité)
+    result_quiz = await db.execute(select(Quiz.id, Quiz.title).where(Quiz.course_id == course_id))
+    quizzes = result_quiz.all()
 
     return {
         "course": {
@@ -192,6 +269,6 @@ async def get_course_by_id(
             "teacher_id": course.owner.id,
             "teacher_name": course.owner.username,
         },
-        "pdfs": [{"id": p.id, "title": p.title, "file_url": p.file_url} for p in pdfs],
+        "pdfs": [{"id": p.id, "title": p.title, "file_url": f"/pdfs/{p.id}/open"} for p in pdfs],
         "quizzes": [{"id": q.id, "title": q.title} for q in quizzes],
     }
\ No newline at end of file
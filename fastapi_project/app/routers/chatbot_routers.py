@@ -1,6 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from app.chatbot.chat_ai import simple_chat  
+from app.chatbot.chat_ai import simple_chat, stream_prompt, answer_scope, prompt_key
+from app.chatbot.answer_cache import answer_cache
+from app.chatbot.llm_executor import llm_executor, LLMSaturatedError
+from app.chatbot.streaming import sse_response, sse_cached_response
+from app.chatbot.single_flight import llm_flights
 router = APIRouter(prefix="/chatbot", tags=["Chatbot Simple"])
 
 
@@ -12,5 +16,38 @@ async def chat(request: ChatRequest):
     """
     Chatbot simple : réponse à une question sans personnalisation
     """
-    answer = simple_chat(request.question)  
+    answer, key = await answer_cache.lookup(answer_scope(None, "simple"), request.question)
+    if answer is not None:
+        return {"answer": answer}
+
+    try:
+        # Génération hors de la boucle asyncio, concurrence limitée
+        # Questions identiques en cours de génération : une seule génération partagée
+        answer = await llm_flights.run(
+            prompt_key(request.question),
+            lambda: llm_executor.run(simple_chat, request.question)
+        )
+    except LLMSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    answer_cache.store(key, answer)
     return {"answer": answer}
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Chatbot simple en streaming (text/event-stream) : les tokens sont envoyés dès leur génération
+    """
+    answer, key = await answer_cache.lookup(answer_scope(None, "simple"), request.question)
+    if answer is not None:
+        return sse_cached_response(answer)
+
+    try:
+        stream = await llm_flights.stream(
+            prompt_key(request.question),
+            lambda: llm_executor.stream(stream_prompt, request.question),
+            on_complete=lambda text: answer_cache.store(key, text)
+        )
+    except LLMSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return sse_response(stream)
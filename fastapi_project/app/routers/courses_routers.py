@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 from app.models.course import Course
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.schemas import schemas
 from app.crud.crud import course_crud
 from app.models.user import User 
@@ -11,6 +11,7 @@ from app.api.auth import verify_role
 from app.core.permissions import allow_roles
 from app.models.user import RoleEnum
 from app.core.permissions import allow_roles
+from app.core.pagination import MAX_PAGE_SIZE, set_next_cursor
 
 
 router = APIRouter(prefix="/courses", tags=["Courses"])
@@ -26,8 +27,23 @@ async def create_course(
     return db_course
 
 @router.get("/", response_model=List[schemas.CourseOut])
-async def read_courses(db: AsyncSession = Depends(get_db)):
-    return await course_crud.get_courses(db)
+async def read_courses(
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    teacher_id: int | None = None,
+    title: str | None = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Page suivante : rappeler avec ?cursor=<en-tête X-Next-Cursor>."""
+    try:
+        courses, next_cursor = await course_crud.list_courses(
+            db, cursor=cursor, limit=limit, teacher_id=teacher_id, title=title
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return courses
 
 @router.get("/teacher", response_model=List[schemas.CourseOut])
 async def read_teacher_courses(
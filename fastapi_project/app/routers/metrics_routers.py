@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+
+from app.core.metrics import CONTENT_TYPE, collect_runtime, render_metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Statistiques du processus courant à jour ; les autres workers publient les leurs périodiquement
+    collect_runtime()
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
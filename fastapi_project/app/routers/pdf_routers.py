@@ -1,16 +1,26 @@
-from fastapi import (APIRouter, Depends, UploadFile, File, Form, status, HTTPException)
+from fastapi import (APIRouter, BackgroundTasks, Depends, UploadFile, File, Form, Query, Request, Response, status, HTTPException)
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import os
-import shutil
+import hashlib
+import tempfile
 from pathlib import Path
-from fastapi.responses import JSONResponse, FileResponse
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from sqlalchemy import select
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.models.pdf import PDF
 from app.schemas.schemas import PDFOut
 from app.models.user import User, RoleEnum
 from app.core.permissions import allow_roles
+from app.core.file_responses import conditional_file_response
+from app.core.file_lock import async_file_lock
+from app.core.pagination import MAX_PAGE_SIZE, set_next_cursor
+from app.crud.crud import pdf_crud
+from app.data.pdfs.pdfs import process_pdf
+from app.chatbot.vector_index import remove_from_course_index
+from app.chatbot.bm25_index import invalidate_bm25
+from app.chatbot.answer_cache import invalidate_course_answers
 
 router = APIRouter(prefix="/pdfs", tags=["PDFs"])
 
@@ -18,6 +28,60 @@ router = APIRouter(prefix="/pdfs", tags=["PDFs"])
 UPLOAD_DIR = "app/uploads/pdfs"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+MAX_PDF_SIZE = int(os.getenv("MAX_PDF_SIZE_MB", "50")) * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+# Un verrou par contenu : rangement du fichier + ligne en base contre « plus référencé → supprimé »
+LOCK_DIR = os.path.join(UPLOAD_DIR, ".locks")
+
+
+def _write_chunk(buffer, digest, chunk: bytes):
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+async def spool_pdf(file: UploadFile) -> tuple[str, str, int]:
+    """
+    Copie le fichier par morceaux hors de la boucle asyncio dans un fichier temporaire
+    de UPLOAD_DIR en calculant son SHA-256.
+    Retourne (tmp_path, content_hash, size_bytes).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_PDF_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"PDF larger than {MAX_PDF_SIZE // (1024 * 1024)} MB"
+                    )
+                await run_in_threadpool(_write_chunk, buffer, digest, chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    return tmp_path, digest.hexdigest(), size
+
+
+def pdf_lock(content_hash: str):
+    return async_file_lock(os.path.join(LOCK_DIR, f"{content_hash}.lock"))
+
+
+def place_pdf(tmp_path: str, content_hash: str) -> str:
+    """
+    Range le fichier sous UPLOAD_DIR/<sha256>.pdf (un seul exemplaire par contenu).
+    À appeler sous pdf_lock(content_hash).
+    """
+    file_path = os.path.join(UPLOAD_DIR, f"{content_hash}.pdf")
+    if os.path.exists(file_path):
+        os.remove(tmp_path)  # contenu déjà stocké
+    else:
+        os.replace(tmp_path, file_path)
+    return file_path
+
 
 # UPLOAD PDF TO A COURSE
 
@@ -27,6 +91,7 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
     status_code=status.HTTP_201_CREATED
 )
 async def upload_pdf_to_course(
+    background_tasks: BackgroundTasks,
     course_id: int = Form(...),
     title: str = Form(...),
     file: UploadFile = File(...),
@@ -40,22 +105,33 @@ async def upload_pdf_to_course(
             detail="Only PDF files are allowed"
         )
 
-    #Save file
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    #Save metadata in DB
-    pdf = PDF(
-        title=title,
-        file_path=file_path,
-        course_id=course_id
-    )
-
-    db.add(pdf)
-    await db.commit()
-    await db.refresh(pdf)
+    #Save file (content-addressed : un fichier déjà connu n'est pas réécrit)
+    tmp_path, content_hash, size_bytes = await spool_pdf(file)
+
+    try:
+        # Fichier rangé et ligne validée sous le verrou du contenu : une suppression
+        # concurrente du même contenu ne peut pas effacer le fichier entre les deux
+        async with pdf_lock(content_hash):
+            file_path = place_pdf(tmp_path, content_hash)
+
+            #Save metadata in DB
+            pdf = PDF(
+                title=title,
+                file_path=file_path,
+                content_hash=content_hash,
+                size_bytes=size_bytes,
+                course_id=course_id
+            )
+
+            db.add(pdf)
+            await db.commit()
+        await db.refresh(pdf)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    #Extraction du texte après la réponse (statut visible sur le PDF)
+    background_tasks.add_task(process_pdf, pdf.id)
 
     return pdf
 
@@ -68,14 +144,30 @@ async def upload_pdf_to_course(
 )
 async def get_pdfs_by_course(
     course_id: int,
-    db: AsyncSession = Depends(get_db)
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    title: str | None = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    result = await db.execute(
-        select(PDF).where(PDF.course_id == course_id)
-    )
-    return result.scalars().all()
+    try:
+        pdfs, next_cursor = await pdf_crud.list_course_pdfs(
+            db, course_id, cursor=cursor, limit=limit, title=title
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return pdfs
+
 
 
+async def remove_unreferenced_file(db: AsyncSession, file_path: str | None):
+    still_used = await db.scalar(
+        select(PDF.id).where(PDF.file_path == file_path).limit(1)
+    )
+    if file_path and still_used is None and os.path.exists(file_path):
+        os.remove(file_path)
+
 
 @router.delete("/{pdf_id}")
 async def delete_pdf(
@@ -91,12 +183,19 @@ async def delete_pdf(
     if not pdf:
         raise HTTPException(status_code=404, detail="PDF not found")
 
-    # 🗑 supprimer le fichier du disque
-    if pdf.file_path and os.path.exists(pdf.file_path):
-        os.remove(pdf.file_path)
-
     await db.delete(pdf)
     await db.commit()
+    await run_in_threadpool(remove_from_course_index, pdf.course_id, pdf.id)
+    invalidate_bm25(pdf.course_id)
+    invalidate_course_answers(pdf.course_id)
+
+    # 🗑 supprimer le fichier du disque s'il n'est plus référencé par aucun PDF
+    if pdf.content_hash:
+        # Revérifié sous le verrou : un envoi du même contenu a pu réutiliser le fichier
+        async with pdf_lock(pdf.content_hash):
+            await remove_unreferenced_file(db, pdf.file_path)
+    else:
+        await remove_unreferenced_file(db, pdf.file_path)
 
     return JSONResponse(
         status_code=200,
@@ -106,6 +205,7 @@ async def delete_pdf(
 @router.get("/{pdf_id}/open")
 async def open_pdf(
     pdf_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(allow_roles(RoleEnum.teacher, RoleEnum.admin, RoleEnum.student)),
 ):
@@ -117,13 +217,26 @@ async def open_pdf(
     if not pdf:
         raise HTTPException(status_code=404, detail="PDF not found")
 
-    file_path = Path(pdf.file_path)  # ✅ s'assurer que Path est importé
-
-    if not file_path.exists():
+    # Un seul stat() : existence + taille + date pour les en-têtes de cache
+    try:
+        stat = os.stat(pdf.file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(
-        path=str(file_path),  # ✅ convertir en string si nécessaire
+    if pdf.content_hash:
+        # Contenu adressé par son hash : ETag fort et cache long
+        etag = f'"{pdf.content_hash}"'
+        cache_control = "private, max-age=86400"
+    else:
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        cache_control = "private, no-cache"
+
+    return conditional_file_response(
+        request,
+        path=pdf.file_path,
+        stat=stat,
+        etag=etag,
         media_type="application/pdf",
-        filename=file_path.name
-    )
\ No newline at end of file
+        filename=f"{pdf.title}.pdf" if pdf.content_hash else Path(pdf.file_path).name,
+        cache_control=cache_control,
+    )
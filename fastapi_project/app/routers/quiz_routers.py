@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.future import select
-from app.db.database import get_db
-from app.schemas.schemas import QuizSubmit, QuizCreate, QuizOut
-from app.crud.crud import QuizCRUD
+from app.db.database import get_db, get_read_db
+from app.schemas.schemas import QuizSubmit, QuizCreate, QuizOut, QuizQuestionCreate, QuizImportOut
+from app.crud.crud import QuizCRUD, NotFoundError
 from app.api.auth import get_current_user
 from app.models.user import RoleEnum, User
 from app.models.quiz import Quiz, QuizQuestion, QuizOption
@@ -27,7 +28,12 @@ async def submit_quiz_endpoint(
     if current_user.role != RoleEnum.student:
         raise HTTPException(status_code=403, detail="Only students can submit quizzes")
 
-    result = await quiz_crud.submit_quiz(db, current_user.id, quiz_id, data.answers)
+    try:
+        result = await quiz_crud.submit_quiz(db, current_user.id, quiz_id, data.answers)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
 
@@ -40,9 +46,68 @@ async def create_quiz_endpoint(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(allow_roles(RoleEnum.teacher, RoleEnum.admin))
 ):
-    quiz = await quiz_crud.create_quiz(db, quiz_data, current_user.id, current_user.role)
+    try:
+        quiz = await quiz_crud.create_quiz(db, quiz_data, current_user.id, current_user.role)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
     return quiz
 
+# IMPORT QUIZ (TEACHER/ADMIN) : une question JSON par ligne (JSON Lines)
+IMPORT_BATCH_SIZE = 500
+
+
+async def read_question_batches(request: Request, batch_size: int = IMPORT_BATCH_SIZE):
+    """Lit le corps de la requête au fil de l'eau et produit des lots de questions."""
+    batch = []
+    buffer = b""
+    line_no = 0
+
+    def parse(line: bytes):
+        try:
+            return QuizQuestionCreate.model_validate_json(line)
+        except ValidationError:
+            raise ValueError(f"Invalid question on line {line_no}")
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if not line.strip():
+                continue
+            batch.append(parse(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if buffer.strip():
+        line_no += 1
+        batch.append(parse(buffer))
+    if batch:
+        yield batch
+
+
+@router.post("/import", response_model=QuizImportOut, status_code=status.HTTP_201_CREATED)
+async def import_quiz_endpoint(
+    request: Request,
+    course_id: int,
+    title: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(allow_roles(RoleEnum.teacher, RoleEnum.admin))
+):
+    try:
+        quiz, imported = await quiz_crud.import_quiz(
+            db, title, course_id, read_question_batches(request), current_user.id, current_user.role
+        )
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return QuizImportOut(id=quiz.id, title=quiz.title, course_id=quiz.course_id, questions_imported=imported)
+
 # GET QUIZ
 @router.get("/{quiz_id}")
 async def get_quiz(
@@ -50,28 +115,36 @@ async def get_quiz(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    quiz = await quiz_crud.get_quiz_by_id(db, quiz_id)
+    snapshot = await quiz_crud.get_quiz_snapshot(db, quiz_id)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    return snapshot.to_dict()
+
+# DELETE QUIZ (TEACHER/ADMIN)
+@router.delete("/{quiz_id}")
+async def delete_quiz(
+    quiz_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(allow_roles(RoleEnum.teacher, RoleEnum.admin))
+):
+    try:
+        quiz = await quiz_crud.delete_quiz(db, quiz_id, current_user.id, current_user.role)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
 
-    return {
-        "id": quiz.id,
-        "title": quiz.title,
-        "course_id": quiz.course_id,
-        "questions": [
-            {
-                "id": q.id,
-                "question": q.question,
-                "options": [{"id": o.id, "text": o.text, "is_correct": o.is_correct} for o in q.options]
-            } for q in quiz.questions
-        ]
-    }
+    return {"message": "Quiz deleted successfully", "quiz_id": quiz_id}
 
 # GET QUIZZES BY COURSE
 @router.get("/course/{course_id}")
 async def get_quizzes_by_course(
     course_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     result = await db.execute(
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
@@ -8,6 +8,8 @@ from app.crud.crud import user_crud
 from app.schemas.schemas import LevelEnum
 from app.models.user import User, RoleEnum
 from app.core.permissions import allow_roles
+from app.core.principal_cache import invalidate_principal
+from app.core.pagination import MAX_PAGE_SIZE, set_next_cursor
 
 
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -20,8 +22,24 @@ async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_d
     return await user_crud.create_user(db, user)
 
 @router.get("/", response_model=List[schemas.UserOut])
-async def read_users(db: AsyncSession = Depends(get_db)):
-    return await user_crud.get_users(db)
+async def read_users(
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    role: RoleEnum | None = None,
+    level: LevelEnum | None = None,
+    is_active: bool | None = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Page suivante : rappeler avec ?cursor=<en-tête X-Next-Cursor>."""
+    try:
+        users, next_cursor = await user_crud.list_users(
+            db, cursor=cursor, limit=limit, role=role, level=level, is_active=is_active
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return users
 
 @router.get("/{user_id}", response_model=schemas.UserOut)
 async def read_user(user_id: int, db: AsyncSession = Depends(get_db)):
@@ -54,6 +72,7 @@ async def update_user_level(
     student.level = level
     await db.commit()
     await db.refresh(student)
+    invalidate_principal(user_id)
 
     return {
         "message": f"Level updated by {current_user.role}",
@@ -102,6 +102,8 @@ class PDFOut(BaseModel):
     title: str
     uploaded_at: datetime
     course_id: int
+    status: str | None = None
+    page_count: int | None = None
 
     model_config = {
         "from_attributes": True
@@ -172,6 +174,12 @@ class QuizOut(BaseModel):
     class Config:
         from_attributes = True
     
+class QuizImportOut(BaseModel):
+    id: int
+    title: str
+    course_id: int
+    questions_imported: int
+
 class QuizResultOut(BaseModel):
     score: int
     total: int
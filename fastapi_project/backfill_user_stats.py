@@ -0,0 +1,30 @@
+import asyncio
+from sqlalchemy import delete, func, insert, select
+from app.db.database import engine
+
+# Importer tous les modèles ici pour les enregistrer
+from app.models.user import User
+from app.models.course import Course
+from app.models.quiz import QuizResult, UserQuizStats
+
+# Reconstruit user_quiz_stats à partir de l'historique complet des QuizResult
+async def main():
+    async with engine.begin() as conn:
+        await conn.execute(delete(UserQuizStats))
+        await conn.execute(
+            insert(UserQuizStats).from_select(
+                ["user_id", "percentage_sum", "results_count", "updated_at"],
+                select(
+                    QuizResult.user_id,
+                    func.sum(QuizResult.percentage),
+                    func.count(QuizResult.id),
+                    func.max(QuizResult.taken_at),
+                )
+                .where(QuizResult.user_id.is_not(None))
+                .group_by(QuizResult.user_id)
+            )
+        )
+    print("✅ User quiz stats rebuilt successfully!")
+
+if __name__ == "__main__":
+    asyncio.run(main())
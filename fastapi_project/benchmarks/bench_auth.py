@@ -0,0 +1,51 @@
+"""
+Benchmark du chemin d'authentification (get_current_user) avec et sans cache de principal.
+
+    python -m benchmarks.bench_auth
+"""
+import asyncio
+
+from benchmarks.common import QueryCounter, Timer, print_report, reset_schema, summarize
+
+from app.db.database import AsyncSessionLocal
+from app.api.auth import create_access_token, get_current_user
+from app.core.principal_cache import principal_cache
+from app.models.user import User, RoleEnum
+
+CALLS = 2000
+
+
+async def main():
+    await reset_schema()
+    counter = QueryCounter()
+
+    async with AsyncSessionLocal() as db:
+        db.add(User(username="bench_student", email="student@gmail.com", password="x", role=RoleEnum.student))
+        await db.commit()
+
+    token = create_access_token(data={"sub": "student@gmail.com"})
+
+    rows = []
+    for mode in ("no_cache", "principal_cache"):
+        principal_cache.clear()
+        latencies = []
+        counter.reset()
+        for _ in range(CALLS):
+            if mode == "no_cache":
+                principal_cache.clear()
+            async with AsyncSessionLocal() as db:
+                with Timer() as t:
+                    await get_current_user(token=token, db=db)
+                latencies.append(t.elapsed)
+
+        rows.append({
+            "mode": mode,
+            "queries_per_call": round(counter.count / CALLS, 3),
+            **summarize(latencies),
+        })
+
+    print_report("auth_path", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
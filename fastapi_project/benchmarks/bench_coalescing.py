@@ -0,0 +1,111 @@
+"""
+Coalescence des prompts identiques en cours de génération (/chatbot/chat et /chatbot/chat/stream).
+
+Rafales de requêtes concurrentes réparties sur un nombre de questions distinctes ;
+compte les générations réellement lancées sur un faux LLM, avec et sans coalescence.
+Le cache de réponses est désactivé pour ne mesurer que la coalescence.
+
+    python -m benchmarks.bench_coalescing
+"""
+import asyncio
+import os
+import threading
+import time
+
+from benchmarks.common import Timer, print_report, summarize
+
+import httpx
+
+import app.chatbot.chat_ai as chat_ai
+from app.chatbot.answer_cache import answer_cache
+from app.chatbot.llm_executor import llm_executor
+from app.chatbot.single_flight import SingleFlight, llm_flights
+from app.main import app as fastapi_app
+
+FAKE_LLM_SECONDS = float(os.getenv("BENCH_FAKE_LLM_SECONDS", "0.2"))
+REQUESTS = 64
+DISTINCT_QUESTIONS = [1, 4, 16, 64]
+
+
+class FakeLLM:
+    """Compte les générations ; bloque le thread comme Ollama."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _count(self):
+        with self._lock:
+            self.calls += 1
+
+    def predict(self, prompt: str) -> str:
+        self._count()
+        time.sleep(FAKE_LLM_SECONDS)
+        return f"Réponse à : {prompt}"
+
+    def stream(self, prompt: str):
+        self._count()
+        for word in f"Réponse à : {prompt}".split():
+            time.sleep(FAKE_LLM_SECONDS / 10)
+            yield word + " "
+
+
+class NoCoalescing(SingleFlight):
+    """Référence : chaque appel lance sa propre génération."""
+
+    async def run(self, key, fn):
+        return await fn()
+
+    async def stream(self, key, open_stream, on_complete=None):
+        return await open_stream()
+
+
+async def one_request(client: httpx.AsyncClient, path: str, question: str, latencies: list, statuses: dict):
+    with Timer() as t:
+        response = await client.post(path, json={"question": question})
+    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    if response.status_code == 200:
+        latencies.append(t.elapsed)
+
+
+async def main():
+    answer_cache.enabled = False
+    import app.routers.chatbot_routers as chatbot_routers
+
+    # Assez de place pour que les rafales sans coalescence ne soient pas rejetées
+    llm_executor.max_queue = REQUESTS
+
+    transport = httpx.ASGITransport(app=fastapi_app)
+    rows = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for mode, flights in (("coalesced", llm_flights), ("baseline", NoCoalescing())):
+            chatbot_routers.llm_flights = flights
+            for path in ("/chatbot/chat", "/chatbot/chat/stream"):
+                for distinct in DISTINCT_QUESTIONS:
+                    fake = chat_ai.llm = FakeLLM()
+                    latencies, statuses = [], {}
+                    questions = [f"Explique la notion numéro {i % distinct}" for i in range(REQUESTS)]
+
+                    with Timer() as total:
+                        await asyncio.gather(*(
+                            one_request(client, path, question, latencies, statuses) for question in questions
+                        ))
+
+                    rows.append({
+                        "mode": mode,
+                        "path": path,
+                        "requests": REQUESTS,
+                        "distinct_prompts": distinct,
+                        "llm_generations": fake.calls,
+                        "statuses": statuses,
+                        "wall_s": round(total.elapsed, 3),
+                        **summarize(latencies),
+                    })
+
+    chatbot_routers.llm_flights = llm_flights
+    print_report("llm_coalescing_fake_%sms" % int(FAKE_LLM_SECONDS * 1000), rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Mémoire des exports en flux (/admin/export/quiz-results) selon le nombre de lignes.
+
+Remplit quiz_results par paliers (jusqu'à un million de lignes par défaut) et consomme
+le corps de la réponse d'export côté serveur en échantillonnant le RSS du processus.
+Référence : chargement de tous les objets ORM (select(QuizResult).scalars().all()),
+mesurée après les exports en flux et limitée aux petits paliers.
+
+    python -m benchmarks.bench_export
+    BENCH_EXPORT_SIZES=100000,1000000 python -m benchmarks.bench_export
+"""
+import asyncio
+import gc
+import os
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.common import Timer, print_report, reset_schema
+
+from sqlalchemy import insert, select
+
+from app.db.database import AsyncSessionLocal
+from app.models.quiz import QuizResult
+from app.routers.admin_routers import export_quiz_results
+
+SIZES = [int(n) for n in os.getenv("BENCH_EXPORT_SIZES", "100000,500000,1000000").split(",")]
+MATERIALIZE_MAX = int(os.getenv("BENCH_EXPORT_MATERIALIZE_MAX", "200000"))
+BATCH = 20000
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+async def seed(start: int, stop: int, rng: random.Random):
+    taken = datetime(2024, 1, 1)
+    async with AsyncSessionLocal() as db:
+        for offset in range(start, stop, BATCH):
+            rows = []
+            for i in range(offset, min(offset + BATCH, stop)):
+                score = rng.randint(0, 10)
+                rows.append({
+                    "user_id": 1 + i % 5000, "quiz_id": 1 + i % 300, "score": score, "total": 10,
+                    "percentage": score * 10.0, "passed": score >= 5, "taken_at": taken + timedelta(seconds=i),
+                })
+            await db.execute(insert(QuizResult), rows)
+        await db.commit()
+
+
+async def stream_export(fmt: str) -> dict:
+    gc.collect()
+    baseline = peak = rss_mb()
+    size = 0
+    # Appel direct de la route : le corps est consommé comme le ferait le serveur ASGI
+    response = await export_quiz_results(format=fmt, admin=None)
+    with Timer() as t:
+        async for chunk in response.body_iterator:
+            size += len(chunk)
+            peak = max(peak, rss_mb())
+    return {"seconds": round(t.elapsed, 2), "output_mb": round(size / 1024 / 1024, 1),
+            "rss_growth_mb": round(peak - baseline, 1)}
+
+
+async def materialize() -> dict:
+    gc.collect()
+    baseline = rss_mb()
+    async with AsyncSessionLocal() as db:
+        with Timer() as t:
+            results = (await db.execute(select(QuizResult))).scalars().all()
+        peak = rss_mb()
+        count = len(results)
+        del results
+    return {"rows_loaded": count, "seconds": round(t.elapsed, 2), "rss_growth_mb": round(peak - baseline, 1)}
+
+
+async def main():
+    await reset_schema()
+    rng = random.Random(0)
+    rows, seeded = [], 0
+
+    for size in SIZES:
+        await seed(seeded, size, rng)
+        seeded = size
+        for fmt in ("csv", "ndjson"):
+            rows.append({"mode": f"stream_{fmt}", "rows": size, **await stream_export(fmt)})
+
+    for size in [s for s in SIZES if s <= MATERIALIZE_MAX]:
+        async with AsyncSessionLocal() as db:
+            await db.execute(QuizResult.__table__.delete().where(QuizResult.id > size))
+            await db.commit()
+        rows.append({"mode": "orm_all", "rows": size, **await materialize()})
+
+    print_report("quiz_results_export_rss", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
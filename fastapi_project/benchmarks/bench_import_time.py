@@ -0,0 +1,73 @@
+"""
+Démarrage à froid de l'application : temps d'import de app.main (python -X importtime).
+
+Chaque mesure est un nouvel interpréteur. Rapporte le temps cumulé de app.main,
+les modules les plus coûteux et vérifie que langchain n'est pas importé au démarrage.
+
+    python -m benchmarks.bench_import_time
+    BENCH_IMPORT_RUNS=10 python -m benchmarks.bench_import_time
+"""
+import os
+import re
+import subprocess
+import sys
+
+from benchmarks.common import print_report, summarize
+
+RUNS = int(os.getenv("BENCH_IMPORT_RUNS", "5"))
+TOP = 15
+TARGET = os.getenv("BENCH_IMPORT_TARGET", "app.main")
+
+_LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+_PROBE = (
+    "import sys, {target}; "
+    "print(any(m.split('.')[0] in ('langchain', 'langchain_community', 'langchain_core') for m in sys.modules))"
+)
+
+
+def import_once() -> tuple[dict[str, tuple[int, int, int]], bool]:
+    """{module: (self_us, cumulative_us, profondeur)} et présence de langchain après l'import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(target=TARGET)],
+        capture_output=True, text=True, env=os.environ.copy(),
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return modules, result.stdout.strip() == "True"
+
+
+def main():
+    totals, top_level = [], {}
+    langchain_loaded = False
+
+    for _ in range(RUNS):
+        modules, loaded = import_once()
+        langchain_loaded |= loaded
+        totals.append(modules[TARGET][1] / 1e6)
+        # Paquets importés directement (profondeur 1), cumul par run
+        for name, (_, cumulative, depth) in modules.items():
+            if depth <= 1:
+                top_level.setdefault(name, []).append(cumulative / 1000)
+
+    heaviest = sorted(top_level.items(), key=lambda item: -sum(item[1]) / len(item[1]))[:TOP]
+
+    rows = [{
+        "target": TARGET,
+        "runs": RUNS,
+        "langchain_imported": langchain_loaded,
+        **summarize(totals),
+        "heaviest_imports_ms": {name: round(sum(v) / len(v), 1) for name, v in heaviest},
+    }]
+    print_report("import_time_%s" % TARGET.replace(".", "_"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Test de charge de /chatbot/chat avec un faux LLM local (génération bloquante simulée).
+
+Envoie des rafales de requêtes concurrentes et mesure en parallèle la latence de "/"
+pour vérifier que la boucle asyncio n'est pas bloquée pendant les générations.
+
+    python -m benchmarks.bench_llm_load
+"""
+import asyncio
+import os
+import time
+
+from benchmarks.common import Timer, print_report, summarize
+
+import httpx
+
+import app.chatbot.chat_ai as chat_ai
+from app.chatbot.llm_executor import llm_executor
+from app.main import app as fastapi_app
+
+FAKE_LLM_SECONDS = float(os.getenv("BENCH_FAKE_LLM_SECONDS", "0.2"))
+BURSTS = [4, 32, 128]
+
+
+class FakeLLM:
+    """Bloque le thread appelant comme le ferait une génération Ollama."""
+
+    def predict(self, prompt: str) -> str:
+        time.sleep(FAKE_LLM_SECONDS)
+        return f"Réponse à : {prompt}"
+
+
+async def probe_loop(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list[float]):
+    while not stop.is_set():
+        with Timer() as t:
+            await client.get("/")
+        latencies.append(t.elapsed)
+        await asyncio.sleep(0.01)
+
+
+async def one_chat(client: httpx.AsyncClient, latencies: list[float], statuses: dict):
+    with Timer() as t:
+        response = await client.post("/chatbot/chat", json={"question": "Explique les réseaux neuronaux"})
+    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    if response.status_code == 200:
+        latencies.append(t.elapsed)
+
+
+async def main():
+    chat_ai.llm = FakeLLM()
+    transport = httpx.ASGITransport(app=fastapi_app)
+    rows = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for burst in BURSTS:
+            chat_latencies, probe_latencies, statuses = [], [], {}
+            stop = asyncio.Event()
+            probe = asyncio.create_task(probe_loop(client, stop, probe_latencies))
+
+            with Timer() as total:
+                await asyncio.gather(*(one_chat(client, chat_latencies, statuses) for _ in range(burst)))
+            stop.set()
+            await probe
+
+            rows.append({
+                "concurrent_requests": burst,
+                "statuses": statuses,
+                "wall_s": round(total.elapsed, 3),
+                "chat": summarize(chat_latencies),
+                "root_during_load": summarize(probe_latencies),
+                "executor": llm_executor.stats(),
+            })
+
+    print_report("llm_load_fake_%sms" % int(FAKE_LLM_SECONDS * 1000), rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Coût des métriques et agrégation multi-processus.
+
+1. Coût d'une observation (compteur + histogramme de latence d'une requête) en mémoire
+   et dans le fichier mappé d'un processus (METRICS_MULTIPROC_DIR).
+2. BENCH_METRICS_WORKERS processus forkés incrémentent chacun les mêmes séries ;
+   /metrics (render_metrics) doit en voir la somme, sans les jauges des processus terminés.
+
+    python -m benchmarks.bench_metrics
+"""
+import os
+import sys
+import tempfile
+
+MULTIPROC_DIR = tempfile.mkdtemp(prefix="bench_metrics_")
+os.environ["METRICS_MULTIPROC_DIR"] = MULTIPROC_DIR
+
+import multiprocessing  # noqa: E402
+import shutil  # noqa: E402
+
+from benchmarks.common import Timer, print_report  # noqa: E402
+
+from app.core import metrics  # noqa: E402
+
+OPERATIONS = int(os.getenv("BENCH_METRICS_OPERATIONS", "200000"))
+WORKERS = int(os.getenv("BENCH_METRICS_WORKERS", "4"))
+PER_WORKER = 10000
+
+
+def observe_cost(values) -> dict:
+    metrics._values = values
+    counter = metrics.http_requests.labels("GET", "/courses/", 200)
+    histogram = metrics.http_latency.labels("GET", "/courses/")
+    with Timer() as t:
+        for i in range(OPERATIONS):
+            counter.inc()
+            histogram.observe(0.001 * (i % 100))
+    return {"storage": type(values).__name__, "operations": OPERATIONS,
+            "ns_per_request": round(t.elapsed / OPERATIONS * 1e9, 1)}
+
+
+def worker():
+    for _ in range(PER_WORKER):
+        metrics.http_requests.labels("GET", "/quizzes/{quiz_id}", 200).inc()
+        metrics.http_latency.labels("GET", "/quizzes/{quiz_id}").observe(0.02)
+    metrics.http_in_progress.set(1)
+
+
+def sample(text: str, prefix: str) -> float:
+    # Série absente (jauge des seuls processus terminés) : 0
+    return next((float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(prefix)), 0.0)
+
+
+def main():
+    rows = [observe_cost(metrics._MemoryValues()), observe_cost(metrics._open_values())]
+
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=worker) for _ in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    with Timer() as t:
+        text = metrics.render_metrics()
+    expected = WORKERS * PER_WORKER
+    total = sample(text, 'http_requests_total{method="GET",route="/quizzes/{quiz_id}",status="200"}')
+    count = sample(text, 'http_request_duration_seconds_count{method="GET",route="/quizzes/{quiz_id}"}')
+    in_progress = sample(text, "http_requests_in_progress")
+    ok = total == expected and count == expected and in_progress == 0
+    rows.append({
+        "workers": WORKERS, "expected": expected, "requests_total": total, "latency_count": count,
+        "in_progress_after_exit": in_progress, "render_ms": round(t.elapsed * 1000, 2), "ok": ok,
+    })
+
+    shutil.rmtree(MULTIPROC_DIR, ignore_errors=True)
+    print_report("metrics", rows)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Pagination des listes : OFFSET (UserCRUD.get_users) contre pagination par clé (UserCRUD.list_users).
+
+Insère BENCH_PAGINATION_USERS utilisateurs, puis lit une page de 100 à différentes profondeurs.
+Pour la pagination par clé, le curseur de la profondeur visée est calculé à l'avance
+(comme le ferait un client qui suit X-Next-Cursor).
+
+    python -m benchmarks.bench_pagination
+    BENCH_PAGINATION_USERS=200000 python -m benchmarks.bench_pagination
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from benchmarks.common import Timer, print_report, reset_schema, summarize
+
+from sqlalchemy import insert, select
+
+from app.core.pagination import encode_cursor
+from app.crud.crud import user_crud
+from app.db.database import AsyncSessionLocal
+from app.models.user import RoleEnum, User
+
+USERS = int(os.getenv("BENCH_PAGINATION_USERS", "100000"))
+PAGE = 100
+REPEAT = 30
+BATCH = 5000
+
+
+async def seed():
+    start = datetime(2024, 1, 1)
+    async with AsyncSessionLocal() as db:
+        for offset in range(0, USERS, BATCH):
+            await db.execute(insert(User), [
+                {
+                    "username": f"user{i}",
+                    "email": f"user{i}@example.com",
+                    "password": "x",
+                    "role": RoleEnum.teacher if i % 20 == 0 else RoleEnum.student,
+                    # plusieurs comptes par seconde : les égalités sont départagées par id
+                    "created_at": start + timedelta(seconds=i // 3),
+                    "updated_at": start,
+                }
+                for i in range(offset, min(offset + BATCH, USERS))
+            ])
+        await db.commit()
+
+
+async def main():
+    await reset_schema()
+    await seed()
+
+    depths = sorted({0, USERS // 100, USERS // 10, USERS // 2, USERS - PAGE})
+    rows = []
+
+    async with AsyncSessionLocal() as db:
+        for depth in depths:
+            # Curseur = dernière ligne de la page précédente
+            cursor = None
+            if depth:
+                last = (await db.execute(
+                    select(User.created_at, User.id).order_by(User.created_at, User.id).offset(depth - 1).limit(1)
+                )).one()
+                cursor = encode_cursor(last.created_at, last.id)
+
+            for mode in ("offset", "keyset"):
+                latencies = []
+                for _ in range(REPEAT):
+                    with Timer() as t:
+                        if mode == "offset":
+                            page = await user_crud.get_users(db, skip=depth, limit=PAGE)
+                        else:
+                            page, _ = await user_crud.list_users(db, cursor=cursor, limit=PAGE)
+                    latencies.append(t.elapsed)
+                    db.expunge_all()
+
+                rows.append({"mode": mode, "users": USERS, "depth": depth, "rows": len(page), **summarize(latencies)})
+
+        # Filtre serveur : les enseignants seulement, au milieu de la liste
+        latencies = []
+        for _ in range(REPEAT):
+            with Timer() as t:
+                page, _ = await user_crud.list_users(db, cursor=cursor, limit=PAGE, role=RoleEnum.teacher)
+            latencies.append(t.elapsed)
+            db.expunge_all()
+        rows.append({"mode": "keyset+role", "users": USERS, "depth": depths[-1], "rows": len(page), **summarize(latencies)})
+
+    print_report("user_listing_page%d" % PAGE, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Pool de connexions sous pic de charge (début d'examen) et coût du journal SQL.
+
+1. BENCH_POOL_CLIENTS requêtes simultanées gardent chacune une connexion le temps d'une requête
+   et de BENCH_POOL_HOLD_MS de traitement ; pour chaque taille de pool : attente au checkout
+   (p50/p99/max, métriques de MeteredQueuePool), timeouts et durée totale.
+2. Mêmes requêtes séquentielles avec echo désactivé puis activé (sortie vers /dev/null).
+
+    python -m benchmarks.bench_pool
+    BENCH_POOL_SIZES=5,20,50 BENCH_POOL_CLIENTS=500 python -m benchmarks.bench_pool
+"""
+import asyncio
+import contextlib
+import os
+
+from benchmarks.common import BENCH_DATABASE_URL, Timer, print_report, summarize
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.pool_metrics import MeteredQueuePool, pool_metrics
+
+POOL_SIZES = [int(n) for n in os.getenv("BENCH_POOL_SIZES", "5,10,20").split(",")]
+CLIENTS = int(os.getenv("BENCH_POOL_CLIENTS", "200"))
+HOLD = float(os.getenv("BENCH_POOL_HOLD_MS", "10")) / 1000
+POOL_TIMEOUT = float(os.getenv("BENCH_POOL_TIMEOUT", "2"))
+ECHO_QUERIES = 2000
+
+
+async def spike(pool_size: int) -> dict:
+    bench_engine = create_async_engine(
+        BENCH_DATABASE_URL, poolclass=MeteredQueuePool,
+        pool_size=pool_size, max_overflow=0, pool_timeout=POOL_TIMEOUT,
+    )
+    pool_metrics.reset()
+
+    async def client():
+        async with bench_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(HOLD)
+
+    with Timer() as t:
+        results = await asyncio.gather(*(client() for _ in range(CLIENTS)), return_exceptions=True)
+    stats = pool_metrics.stats(bench_engine.pool)
+    await bench_engine.dispose()
+
+    return {
+        "pool_size": pool_size, "clients": CLIENTS, "seconds": round(t.elapsed, 3),
+        "errors": sum(isinstance(r, Exception) for r in results),
+        **{k: stats[k] for k in ("checkouts", "timeouts", "wait_p50_ms", "wait_p99_ms", "wait_max_ms")},
+    }
+
+
+async def echo_cost(echo: bool) -> dict:
+    latencies = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # Le gestionnaire de journal d'echo écrit sur le sys.stdout courant à la création de l'engine
+        bench_engine = create_async_engine(BENCH_DATABASE_URL, echo=echo)
+        async with bench_engine.connect() as conn:
+            for i in range(ECHO_QUERIES):
+                with Timer() as t:
+                    await conn.execute(text("SELECT :i"), {"i": i})
+                latencies.append(t.elapsed)
+        await bench_engine.dispose()
+    return {"echo": echo, **summarize(latencies)}
+
+
+async def main():
+    rows = [await spike(size) for size in POOL_SIZES]
+    rows += [await echo_cost(False), await echo_cost(True)]
+    print_report("db_pool", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Benchmark de la recherche dans les PDF d'un cours : BM25 seul, dense seul, hybride.
+
+Corpus synthétique « français » (mots accentués), requêtes tirées de morceaux existants.
+Rapporte la latence par requête et la mémoire de chaque index.
+
+    python -m benchmarks.bench_retrieval
+    BENCH_RETRIEVAL_SIZES=10000,100000 python -m benchmarks.bench_retrieval
+"""
+import os
+import random
+import shutil
+import tempfile
+
+from benchmarks.common import Timer, print_report, summarize
+
+from app.chatbot.bm25_index import build_bm25_index
+from app.chatbot.vector_index import CourseVectorIndex, embed
+
+SIZES = [int(n) for n in os.getenv("BENCH_RETRIEVAL_SIZES", "10000,50000").split(",")]
+WORDS_PER_CHUNK = 150
+VOCABULARY = 20000
+QUERIES = 100
+K = 4
+CANDIDATES = 50
+
+SYLLABLES = ["ré", "seau", "neu", "ro", "nal", "don", "née", "ap", "pren", "tis", "sa", "ge",
+             "mo", "dè", "le", "al", "go", "rith", "me", "cou", "che", "sys", "tè", "ma"]
+
+
+def make_vocabulary(rng: random.Random) -> list[str]:
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(VOCABULARY)]
+
+
+def make_corpus(rng: random.Random, vocabulary: list[str], size: int) -> list[str]:
+    # Distribution de Zipf approximative : quelques mots très fréquents
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return [" ".join(rng.choices(vocabulary, weights, k=WORDS_PER_CHUNK)) for _ in range(size)]
+
+
+def main():
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(rng)
+    root = tempfile.mkdtemp(prefix="bench_retrieval_")
+    rows = []
+
+    try:
+        for size in SIZES:
+            corpus = make_corpus(rng, vocabulary, size)
+            chunk_ids = list(range(1, size + 1))
+
+            with Timer() as bm25_build:
+                bm25 = build_bm25_index(list(zip(chunk_ids, corpus)))
+
+            dense = CourseVectorIndex(course_id=size, root=root)
+            with Timer() as dense_build:
+                for start in range(0, size, 5000):
+                    dense.add(0, chunk_ids[start:start + 5000], embed(corpus[start:start + 5000]))
+
+            queries = [" ".join(rng.sample(corpus[rng.randrange(size)].split(), 4)) for _ in range(QUERIES)]
+
+            def run_bm25(question):
+                return bm25.search(question, K)
+
+            def run_dense(question):
+                return dense.search(embed([question])[0], K)
+
+            def run_hybrid(question):
+                candidates = bm25.search(question, CANDIDATES)
+                return dense.score_chunks(embed([question])[0], [c for c, _ in candidates])[:K]
+
+            memory = {
+                "bm25": bm25.memory_bytes(),
+                "dense": dense.vectors.nbytes + dense.chunk_ids.nbytes + dense.pdf_ids.nbytes,
+            }
+            memory["hybrid"] = memory["bm25"] + memory["dense"]
+
+            for mode, run in (("bm25", run_bm25), ("dense", run_dense), ("hybrid", run_hybrid)):
+                latencies = []
+                for question in queries:
+                    with Timer() as t:
+                        run(question)
+                    latencies.append(t.elapsed)
+                rows.append({
+                    "mode": mode,
+                    "chunks": size,
+                    "index_mb": round(memory[mode] / 1024 / 1024, 2),
+                    "build_s": round(
+                        {"bm25": bm25_build.elapsed, "dense": dense_build.elapsed}.get(
+                            mode, bm25_build.elapsed + dense_build.elapsed
+                        ), 3
+                    ),
+                    **summarize(latencies),
+                })
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print_report("course_retrieval_top%d" % K, rows)
+
+
+if __name__ == "__main__":
+    main()
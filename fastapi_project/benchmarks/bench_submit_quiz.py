@@ -0,0 +1,113 @@
+"""
+Benchmark de QuizCRUD.submit_quiz : requêtes SQL et latence selon le nombre de questions.
+
+Compare la correction actuelle (options déjà chargées) à l'ancienne correction
+(une requête par réponse soumise).
+
+    python -m benchmarks.bench_submit_quiz
+"""
+import asyncio
+
+from benchmarks.common import QueryCounter, Timer, print_report, reset_schema, summarize
+
+from sqlalchemy.future import select
+
+from app.db.database import AsyncSessionLocal
+from app.crud.crud import quiz_crud
+from app.models.user import User, RoleEnum
+from app.models.course import Course
+from app.models.quiz import Quiz, QuizQuestion, QuizOption
+from app.schemas.schemas import QuizAnswer
+
+QUESTION_COUNTS = [10, 40, 160]
+OPTIONS_PER_QUESTION = 4
+SUBMISSIONS = 50
+
+
+async def seed_quiz(db, course_id: int, n_questions: int) -> tuple[int, list[QuizAnswer]]:
+    quiz = Quiz(title=f"Bench {n_questions}", course_id=course_id)
+    db.add(quiz)
+    await db.flush()
+
+    answers = []
+    for i in range(n_questions):
+        question = QuizQuestion(quiz_id=quiz.id, question=f"Question {i}")
+        db.add(question)
+        await db.flush()
+        options = [
+            QuizOption(question_id=question.id, text=f"Option {j}", is_correct=(j == 0))
+            for j in range(OPTIONS_PER_QUESTION)
+        ]
+        db.add_all(options)
+        await db.flush()
+        # Une réponse sur deux est juste : le quiz n'est jamais validé
+        chosen = options[0] if i % 2 == 0 else options[1]
+        answers.append(QuizAnswer(question_id=question.id, option_id=chosen.id))
+
+    await db.commit()
+    return quiz.id, answers
+
+
+async def legacy_score(db, quiz_id: int, answers: list[QuizAnswer]) -> int:
+    """Ancienne correction : une requête par réponse."""
+    score = 0
+    answered = set()
+    for answer in answers:
+        res = await db.execute(
+            select(QuizOption)
+            .join(QuizQuestion)
+            .where(QuizOption.id == answer.option_id, QuizQuestion.quiz_id == quiz_id)
+        )
+        option = res.scalars().first()
+        if not option or option.question_id in answered:
+            continue
+        answered.add(option.question_id)
+        if option.is_correct:
+            score += 1
+    return score
+
+
+async def main():
+    await reset_schema()
+    counter = QueryCounter()
+
+    async with AsyncSessionLocal() as db:
+        teacher = User(username="bench_teacher", email="teacher@gmail.com", password="x", role=RoleEnum.teacher)
+        student = User(username="bench_student", email="student@gmail.com", password="x", role=RoleEnum.student)
+        db.add_all([teacher, student])
+        await db.flush()
+        course = Course(title="Bench", teacher_id=teacher.id)
+        db.add(course)
+        await db.commit()
+        student_id, course_id = student.id, course.id
+
+    rows = []
+    for n_questions in QUESTION_COUNTS:
+        async with AsyncSessionLocal() as db:
+            quiz_id, answers = await seed_quiz(db, course_id, n_questions)
+
+        for mode in ("legacy_per_answer", "submit_quiz"):
+            latencies, queries = [], []
+            for _ in range(SUBMISSIONS):
+                async with AsyncSessionLocal() as db:
+                    counter.reset()
+                    with Timer() as t:
+                        if mode == "submit_quiz":
+                            await quiz_crud.submit_quiz(db, student_id, quiz_id, answers)
+                        else:
+                            await legacy_score(db, quiz_id, answers)
+                    latencies.append(t.elapsed)
+                    queries.append(counter.count)
+
+            rows.append({
+                "mode": mode,
+                "questions": n_questions,
+                "queries_per_call": max(queries),
+                **summarize(latencies),
+            })
+
+    print_report("submit_quiz", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""
+Benchmark de l'index vectoriel par cours : latence top-k à 10k et 1M morceaux.
+
+Les vecteurs sont aléatoires (normalisés) et écrits par blocs dans un dossier temporaire,
+la recherche lit la matrice en memmap comme en production.
+
+    python -m benchmarks.bench_vector_index
+    BENCH_VECTOR_SIZES=10000,100000 python -m benchmarks.bench_vector_index
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import Timer, print_report, summarize
+
+from app.chatbot.vector_index import CourseVectorIndex, EMBEDDING_DIM
+
+SIZES = [int(n) for n in os.getenv("BENCH_VECTOR_SIZES", "10000,1000000").split(",")]
+QUERIES = 50
+K = 5
+WRITE_BLOCK = 50000
+
+
+def random_unit_vectors(rng, n: int) -> np.ndarray:
+    vectors = rng.standard_normal((n, EMBEDDING_DIM), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def main():
+    rng = np.random.default_rng(0)
+    root = tempfile.mkdtemp(prefix="bench_index_")
+    rows = []
+
+    try:
+        for size in SIZES:
+            index = CourseVectorIndex(course_id=size, root=root)
+            with Timer() as build:
+                for start in range(0, size, WRITE_BLOCK):
+                    count = min(WRITE_BLOCK, size - start)
+                    index.add(start // WRITE_BLOCK, list(range(start, start + count)), random_unit_vectors(rng, count))
+
+            queries = random_unit_vectors(rng, QUERIES)
+            latencies = []
+            for query in queries:
+                with Timer() as t:
+                    index.search(query, K)
+                latencies.append(t.elapsed)
+
+            with Timer() as batch:
+                index.search_batch(queries, K)
+
+            rows.append({
+                "chunks": size,
+                "dim": EMBEDDING_DIM,
+                "build_s": round(build.elapsed, 3),
+                "batch_of_%d_ms" % QUERIES: round(batch.elapsed * 1000, 3),
+                **summarize(latencies),
+            })
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print_report("vector_index_top%d" % K, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Budgets de requêtes SQL des routes fréquentes : échoue si une route dépasse son budget
+ou répète une même forme de requête (N+1), pour attraper les régressions.
+
+Chaque route est appelée deux fois (caches froids puis chauds) via le client ASGI en processus ;
+le budget s'applique aux deux appels. Code de sortie 1 en cas de dépassement.
+
+    python -m benchmarks.check_query_budgets
+"""
+import asyncio
+import sys
+
+import httpx
+
+from benchmarks.common import print_report, reset_schema
+
+from sqlalchemy import insert
+
+from app.core.cache import caches
+from app.db.database import AsyncSessionLocal
+from app.db.query_stats import QUERY_REPEAT_THRESHOLD, QueryBudgetExceeded, query_budget
+from app.main import app
+from app.models.pdf import PDF
+
+QUESTIONS = 20
+PDFS = 30
+
+# (nom, méthode, chemin, rôle, budget) ; le premier appel inclut le chargement de l'utilisateur du token
+BUDGETS = [
+    ("auth_me", "GET", "/auth/me", "stud", 1),
+    ("course_list", "GET", "/courses/", None, 1),
+    ("course_pdfs", "GET", "/pdfs/course/{course_id}", None, 1),
+    ("course_quizzes", "GET", "/quizzes/course/{course_id}", "stud", 3),
+    ("quiz_fetch", "GET", "/quizzes/{quiz_id}", "stud", 3),
+    ("quiz_submit", "POST", "/quizzes/{quiz_id}/submit", "stud", 5),
+    ("admin_course", "GET", "/admin/courses/{course_id}", "adm", 4),
+    ("admin_dashboard", "GET", "/admin/dashboard", "adm", 1),
+]
+
+
+async def seed(client: httpx.AsyncClient) -> dict:
+    tokens = {}
+    for username, role in (("prof", "teacher"), ("stud", "student"), ("adm", "admin")):
+        await client.post("/auth/register", json={
+            "username": username, "email": f"{username}@gmail.com", "password": "pw", "role": role,
+        })
+        login = await client.post("/auth/login", data={"username": f"{username}@gmail.com", "password": "pw"})
+        tokens[username] = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    course = (await client.post("/courses/", json={"title": "C", "teacher_id": 1}, headers=tokens["prof"])).json()
+    quiz = (await client.post("/quizzes/create", json={
+        "title": "Q", "course_id": course["id"],
+        "questions": [
+            {"question": f"q{i}", "options": [{"text": "a", "is_correct": True}, {"text": "b", "is_correct": False}]}
+            for i in range(QUESTIONS)
+        ],
+    }, headers=tokens["prof"])).json()
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(PDF), [
+            {"title": f"p{i}", "file_path": f"{i}.pdf", "course_id": course["id"]} for i in range(PDFS)
+        ])
+        await db.commit()
+
+    questions = (await client.get(f"/quizzes/{quiz['id']}", headers=tokens["stud"])).json()["questions"]
+    answers = {"answers": [{"question_id": q["id"], "option_id": q["options"][0]["id"]} for q in questions]}
+    return {"tokens": tokens, "course_id": course["id"], "quiz_id": quiz["id"], "answers": answers}
+
+
+async def main():
+    await reset_schema()
+    rows, failures = [], 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+        data = await seed(client)
+        for cache in caches.values():
+            cache.clear()
+
+        for name, method, path, role, budget in BUDGETS:
+            url = path.format(course_id=data["course_id"], quiz_id=data["quiz_id"])
+            headers = data["tokens"][role] if role else {}
+            body = data["answers"] if method == "POST" else None
+            counts, error = [], None
+            for _ in range(2):
+                try:
+                    with query_budget(budget, QUERY_REPEAT_THRESHOLD - 1) as stats:
+                        response = await client.request(method, url, headers=headers, json=body)
+                except QueryBudgetExceeded as e:
+                    error = error or str(e)
+                counts.append(stats.count)
+            ok = error is None and response.status_code < 400
+            failures += not ok
+            rows.append({
+                "route": name, "status": response.status_code, "budget": budget,
+                "queries_cold": counts[0], "queries_warm": counts[1],
+                "server_timing": response.headers.get("server-timing"), "ok": ok, "error": error,
+            })
+
+    print_report("query_budgets", rows)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+"""
+Vérifie par EXPLAIN que les requêtes fréquentes passent par un index (aucun parcours complet de table).
+
+Construit le schéma depuis les modèles, insère un jeu de données, puis exécute chaque requête
+préfixée par EXPLAIN (SQLite : EXPLAIN QUERY PLAN ; PostgreSQL : EXPLAIN (FORMAT JSON)
+avec enable_seqscan désactivé, pour juger l'index utilisable même sur une petite table).
+Code de sortie 1 si une requête fait un parcours séquentiel.
+
+    python -m benchmarks.check_query_plans
+    BENCH_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.check_query_plans
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks.common import print_report, reset_schema
+
+from sqlalchemy import insert, select, text, tuple_
+
+from app.db.database import engine
+from app.models.course import Course
+from app.models.enrollment import Enrollment
+from app.models.pdf import PDF
+from app.models.quiz import Quiz, QuizOption, QuizQuestion, QuizResult
+from app.models.user import RoleEnum, User
+
+USERS = 2000
+COURSES = 200
+
+HOT_QUERIES = {
+    "submit_quiz_already_passed": select(QuizResult).where(
+        QuizResult.user_id == 42, QuizResult.quiz_id == 7, QuizResult.passed == True  # noqa: E712
+    ),
+    "student_courses": select(Enrollment).where(Enrollment.student_id == 42),
+    "course_pdfs_page": select(PDF).where(PDF.course_id == 7).order_by(PDF.uploaded_at, PDF.id).limit(101),
+    "course_quizzes": select(Quiz).where(Quiz.course_id == 7),
+    "quiz_questions_selectin": select(QuizQuestion).where(QuizQuestion.quiz_id.in_([7, 8])),
+    "quiz_options_selectin": select(QuizOption).where(QuizOption.question_id.in_([70, 71, 72])),
+    "users_keyset_page": select(User)
+        .where(tuple_(User.created_at, User.id) > tuple_(datetime(2024, 1, 1, 0, 10), 600))
+        .order_by(User.created_at, User.id).limit(101),
+}
+
+
+async def seed():
+    start = datetime(2024, 1, 1)
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [
+            {"username": f"u{i}", "email": f"u{i}@example.com", "password": "x",
+             "role": RoleEnum.teacher if i < COURSES else RoleEnum.student,
+             "created_at": start + timedelta(seconds=i), "updated_at": start}
+            for i in range(1, USERS + 1)
+        ])
+        await conn.execute(insert(Course), [
+            {"title": f"c{i}", "teacher_id": i, "created_at": start, "updated_at": start} for i in range(1, COURSES + 1)
+        ])
+        await conn.execute(insert(PDF), [
+            {"title": f"p{i}", "file_path": f"{i}.pdf", "course_id": 1 + i % COURSES, "uploaded_at": start}
+            for i in range(5 * COURSES)
+        ])
+        await conn.execute(insert(Quiz), [{"title": f"q{i}", "course_id": 1 + i % COURSES} for i in range(2 * COURSES)])
+        await conn.execute(insert(QuizQuestion), [
+            {"quiz_id": 1 + i % (2 * COURSES), "question": f"?{i}"} for i in range(10 * 2 * COURSES)
+        ])
+        await conn.execute(insert(QuizOption), [
+            {"question_id": 1 + i % (20 * COURSES), "text": "o", "is_correct": i % 4 == 0} for i in range(80 * COURSES)
+        ])
+        await conn.execute(insert(Enrollment), [
+            {"student_id": student_id, "course_id": 1 + (student_id + k) % COURSES}
+            for student_id in range(COURSES + 1, USERS + 1) for k in range(3)
+        ])
+        await conn.execute(insert(QuizResult), [
+            {"user_id": 1 + i % USERS, "quiz_id": 1 + i % (2 * COURSES), "score": i % 10, "total": 10,
+             "percentage": (i % 10) * 10.0, "passed": i % 10 >= 7}
+            for i in range(20 * USERS)
+        ])
+        await conn.execute(text("ANALYZE"))
+
+
+def explain_prefix(dialect: str) -> str:
+    return "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN (FORMAT JSON) "
+
+
+def plan_nodes(dialect: str, rows: list) -> list[str]:
+    if dialect == "sqlite":
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+
+    nodes = []
+
+    def walk(node):
+        nodes.append(f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}".strip())
+        for child in node.get("Plans", []):
+            walk(child)
+
+    plan = rows[0][0]
+    walk((json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"])
+    return nodes
+
+
+def is_sequential(dialect: str, node: str) -> bool:
+    if dialect == "sqlite":
+        return node.startswith("SCAN ") and "USING" not in node
+    return node.startswith("Seq Scan")
+
+
+async def explain(conn, stmt) -> list:
+    # Requête compilée puis exécutée brute : le plan n'a pas les colonnes (ni les types) de stmt
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    result = await conn.exec_driver_sql(explain_prefix(conn.dialect.name) + str(compiled), params)
+    return [tuple(row) for row in result]
+
+
+async def main():
+    await reset_schema()
+    await seed()
+
+    dialect = engine.dialect.name
+    rows, failures = [], 0
+    async with engine.connect() as conn:
+        if dialect == "postgresql":
+            await conn.execute(text("SET enable_seqscan = off"))
+        for name, stmt in HOT_QUERIES.items():
+            nodes = plan_nodes(dialect, await explain(conn, stmt))
+            sequential = [node for node in nodes if is_sequential(dialect, node)]
+            failures += bool(sequential)
+            rows.append({"query": name, "uses_index": not sequential, "plan": nodes})
+
+    print_report(f"hot_query_plans_{dialect}", rows)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Vérifie le routage des lectures vers une réplica et la lecture de ses propres écritures,
+avec deux bases SQLite locales : la principale et une « réplica » obtenue par copie du fichier
+(instantané figé, comme une réplica en retard).
+
+1. Cours A créé puis instantané vers la réplica ; cours B créé ensuite (absent de la réplica).
+2. Le client qui vient d'écrire (cookie de fenêtre) voit B : lecture sur la principale.
+3. Un autre client ne voit que A : lecture sur la réplica.
+4. Fenêtre expirée : le premier client relit aussi la réplica.
+
+Code de sortie 1 si une vérification échoue.
+
+    python -m benchmarks.check_read_replica
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+REPLICA_PATH = os.path.join(tempfile.gettempdir(), "bench_plateforme_replica.db")
+os.environ["DATABASE_REPLICA_URLS"] = "sqlite+aiosqlite:///" + REPLICA_PATH
+os.environ.setdefault("DB_REPLICA_STICKY_SECONDS", "1")
+
+import asyncio  # noqa: E402
+
+import httpx  # noqa: E402
+
+from benchmarks.common import print_report, reset_schema  # noqa: E402
+
+from app.db.database import engine, replica_engines  # noqa: E402
+from app.db.read_routing import DB_REPLICA_STICKY_SECONDS, STICKY_COOKIE  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+async def replicate():
+    """Instantané de la base principale vers la réplica (connexions fermées pendant la copie)."""
+    await engine.dispose()
+    for replica in replica_engines:
+        await replica.dispose()
+    shutil.copyfile(engine.url.database, REPLICA_PATH)
+
+
+def course_titles(response: httpx.Response) -> list[str]:
+    return sorted(course["title"] for course in response.json())
+
+
+async def main():
+    await reset_schema()
+    rows, failures = [], 0
+
+    def check(name: str, ok: bool, detail):
+        nonlocal failures
+        failures += not ok
+        rows.append({"check": name, "ok": ok, "detail": detail})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as writer, \
+            httpx.AsyncClient(transport=transport, base_url="http://testserver") as other:
+        await writer.post("/auth/register", json={
+            "username": "prof", "email": "prof@gmail.com", "password": "pw", "role": "teacher",
+        })
+        token = (await writer.post(
+            "/auth/login", data={"username": "prof@gmail.com", "password": "pw"}
+        )).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        await writer.post("/courses/", json={"title": "A", "teacher_id": 1}, headers=headers)
+        await replicate()
+        writer.cookies.clear()
+
+        created = await writer.post("/courses/", json={"title": "B", "teacher_id": 1}, headers=headers)
+        check("write sets sticky cookie", STICKY_COOKIE in created.headers.get("set-cookie", ""),
+              created.headers.get("set-cookie"))
+
+        titles = course_titles(await writer.get("/courses/"))
+        check("writer reads own write (primary)", titles == ["A", "B"], titles)
+
+        titles = course_titles(await other.get("/courses/"))
+        check("other client reads replica", titles == ["A"], titles)
+
+        await asyncio.sleep(DB_REPLICA_STICKY_SECONDS + 0.2)
+        titles = course_titles(await writer.get("/courses/"))
+        check("writer back on replica after window", titles == ["A"], titles)
+
+    print_report("read_replica_routing", rows)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Outils communs aux benchmarks : base SQLite locale, comptage des requêtes, percentiles.
+
+A importer AVANT tout module app.* : DATABASE_URL est forcé vers une base jetable
+(BENCH_DATABASE_URL pour en choisir une autre) afin de ne jamais toucher la vraie base.
+"""
+import json
+import os
+import tempfile
+import time
+
+BENCH_DATABASE_URL = os.getenv(
+    "BENCH_DATABASE_URL",
+    "sqlite+aiosqlite:///" + os.path.join(tempfile.gettempdir(), "bench_plateforme.db"),
+)
+os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+
+from sqlalchemy import event  # noqa: E402
+
+from app.db.database import engine, Base  # noqa: E402
+
+engine.echo = False
+
+
+class QueryCounter:
+    """Compte les requêtes SQL envoyées par le moteur (toutes sessions confondues)."""
+
+    def __init__(self, async_engine=engine):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+async def reset_schema():
+    # Importer tous les modèles pour les enregistrer dans Base.metadata
+    import app.models.user  # noqa: F401
+    import app.models.course  # noqa: F401
+    import app.models.pdf  # noqa: F401
+    import app.models.enrollment  # noqa: F401
+    import app.models.quiz  # noqa: F401
+    import app.models.dashboard  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: list[float]) -> dict:
+    """Latences en secondes -> statistiques en millisecondes."""
+    return {
+        "n": len(latencies),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def print_report(name: str, rows: list[dict]):
+    print(json.dumps({"benchmark": name, "results": rows}, indent=2, default=str))
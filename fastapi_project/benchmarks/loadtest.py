@@ -0,0 +1,378 @@
+"""
+Test de charge reproductible des routes fréquentes, sur une base locale aux volumes réalistes.
+
+1. Remplissage (graine fixe) : 100k étudiants, 2k cours, 20k quiz (5 questions, 2 options),
+   5M résultats de quiz, un PDF par cours. LOADTEST_SCALE réduit ou augmente tous les volumes
+   (0.01 pour un essai rapide), LOADTEST_<VOLUME> fixe un volume précis (ex. LOADTEST_RESULTS).
+2. Chaque scénario envoie LOADTEST_REQUESTS requêtes avec LOADTEST_CONCURRENCY clients
+   concurrents via le client ASGI en processus : login, /auth/me, liste des cours, quiz,
+   soumission, ouverture de PDF, chatbot (faux LLM, LOADTEST_LLM_SECONDS par génération).
+3. Rapport : débit, p50/p95/p99, requêtes SQL par requête HTTP ; écrit en JSON dans
+   benchmarks/reports/ (LOADTEST_REPORT_DIR) pour comparer les exécutions.
+
+    python -m benchmarks.loadtest                  remplit la base puis lance les scénarios
+    python -m benchmarks.loadtest --skip-seed      réutilise la base déjà remplie
+    python -m benchmarks.loadtest compare A.json B.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import BENCH_DATABASE_URL, Timer, print_report, reset_schema, summarize
+
+import httpx
+from sqlalchemy import insert
+
+import app.chatbot.chat_ai as chat_ai
+from app.api.auth import create_access_token
+from app.core.cache import caches
+from app.crud.crud import PASS_SCORE
+from app.db.database import engine
+from app.db.query_stats import collect_queries
+from app.main import app
+from app.models.course import Course
+from app.models.pdf import PDF
+from app.models.quiz import Quiz, QuizOption, QuizQuestion, QuizResult, UserQuizStats
+from app.models.user import LevelEnum, RoleEnum, User
+
+SCALE = float(os.getenv("LOADTEST_SCALE", "1"))
+
+
+def _volume(name: str, default: int) -> int:
+    return max(1, int(os.getenv(f"LOADTEST_{name}", default * SCALE)))
+
+
+VOLUMES = {
+    "students": _volume("STUDENTS", 100_000),
+    "courses": _volume("COURSES", 2_000),
+    "quizzes": _volume("QUIZZES", 20_000),
+    "results": _volume("RESULTS", 5_000_000),
+}
+TEACHERS = max(1, VOLUMES["courses"] // 10)
+QUESTIONS_PER_QUIZ = 5
+OPTIONS_PER_QUESTION = 2
+
+SEED = int(os.getenv("LOADTEST_SEED", "42"))
+BATCH = int(os.getenv("LOADTEST_BATCH", "20000"))
+REQUESTS = int(os.getenv("LOADTEST_REQUESTS", "1000"))
+CONCURRENCY = int(os.getenv("LOADTEST_CONCURRENCY", "32"))
+# Étudiants connectés pendant le test (tokens obtenus par le scénario login)
+ACTIVE_USERS = int(os.getenv("LOADTEST_ACTIVE_USERS", "500"))
+LLM_SECONDS = float(os.getenv("LOADTEST_LLM_SECONDS", "0.05"))
+# Questions distinctes posées au chatbot : les suivantes tombent dans le cache de réponses
+CHAT_QUESTIONS = int(os.getenv("LOADTEST_CHAT_QUESTIONS", "100"))
+REPORT_DIR = os.getenv("LOADTEST_REPORT_DIR", os.path.join(os.path.dirname(__file__), "reports"))
+PDF_PATH = os.path.join(tempfile.gettempdir(), "loadtest_course.pdf")
+
+# PDF minimal valide (une page vide)
+PDF_BYTES = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 612 792]>>endobj\n"
+    b"trailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+
+class StubLLM:
+    """Génération bloquante de durée fixe, à la place d'Ollama."""
+
+    def predict(self, prompt: str, **kwargs) -> str:
+        time.sleep(LLM_SECONDS)
+        return f"Réponse à : {prompt}"
+
+
+# Identifiants déterministes : la question j du quiz q et ses options se déduisent sans requête
+def question_id(quiz_id: int, j: int) -> int:
+    return (quiz_id - 1) * QUESTIONS_PER_QUIZ + j + 1
+
+
+def correct_option_id(question: int) -> int:
+    return (question - 1) * OPTIONS_PER_QUESTION + 1
+
+
+def student_email(student_id: int) -> str:
+    return f"student{student_id}@gmail.com"
+
+
+# ---------- Remplissage ----------
+
+async def insert_rows(model, rows):
+    """Insertion par lots (executemany), une transaction par lot."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            async with engine.begin() as conn:
+                await conn.execute(insert(model), batch)
+            batch = []
+    if batch:
+        async with engine.begin() as conn:
+            await conn.execute(insert(model), batch)
+
+
+async def seed() -> dict:
+    rng = random.Random(SEED)
+    students, courses, quizzes, results = (
+        VOLUMES["students"], VOLUMES["courses"], VOLUMES["quizzes"], VOLUMES["results"]
+    )
+    timings = {}
+
+    with open(PDF_PATH, "wb") as f:
+        f.write(PDF_BYTES)
+
+    await reset_schema()
+
+    with Timer() as t:
+        # Étudiants 1..students, enseignants ensuite
+        await insert_rows(User, (
+            {"id": i, "username": f"student{i}", "email": student_email(i), "password": "pw",
+             "role": RoleEnum.student, "level": LevelEnum.beginner}
+            for i in range(1, students + 1)
+        ))
+        await insert_rows(User, (
+            {"id": students + i, "username": f"teacher{i}", "email": f"teacher{i}@gmail.com",
+             "password": "pw", "role": RoleEnum.teacher}
+            for i in range(1, TEACHERS + 1)
+        ))
+    timings["users_s"] = round(t.elapsed, 2)
+
+    with Timer() as t:
+        await insert_rows(Course, (
+            {"id": i, "title": f"Cours {i}", "description": "Cours de démonstration",
+             "teacher_id": students + rng.randint(1, TEACHERS)}
+            for i in range(1, courses + 1)
+        ))
+        await insert_rows(PDF, (
+            {"id": i, "title": f"Support {i}", "file_path": PDF_PATH, "size_bytes": len(PDF_BYTES),
+             "course_id": i}
+            for i in range(1, courses + 1)
+        ))
+        await insert_rows(Quiz, (
+            {"id": q, "title": f"Quiz {q}", "course_id": (q - 1) % courses + 1}
+            for q in range(1, quizzes + 1)
+        ))
+        await insert_rows(QuizQuestion, (
+            {"id": question_id(q, j), "quiz_id": q, "question": f"Question {j + 1} du quiz {q}"}
+            for q in range(1, quizzes + 1) for j in range(QUESTIONS_PER_QUIZ)
+        ))
+        await insert_rows(QuizOption, (
+            {"id": correct_option_id(question) + k, "question_id": question,
+             "text": f"Option {k + 1}", "is_correct": k == 0}
+            for question in range(1, quizzes * QUESTIONS_PER_QUIZ + 1) for k in range(OPTIONS_PER_QUESTION)
+        ))
+    timings["catalog_s"] = round(t.elapsed, 2)
+
+    with Timer() as t:
+        # Agrégats par étudiant cohérents avec les résultats générés
+        sums, counts = {}, {}
+        start = datetime(2024, 1, 1)
+
+        def result_rows():
+            for _ in range(results):
+                user_id = rng.randint(1, students)
+                score = rng.randint(0, QUESTIONS_PER_QUIZ)
+                percentage = round(score / QUESTIONS_PER_QUIZ * 100, 2)
+                sums[user_id] = sums.get(user_id, 0.0) + percentage
+                counts[user_id] = counts.get(user_id, 0) + 1
+                yield {
+                    "user_id": user_id, "quiz_id": rng.randint(1, quizzes), "score": score,
+                    "total": QUESTIONS_PER_QUIZ, "percentage": percentage, "passed": percentage >= PASS_SCORE,
+                    "taken_at": start + timedelta(seconds=rng.randint(0, 365 * 86400)),
+                }
+
+        await insert_rows(QuizResult, result_rows())
+        await insert_rows(UserQuizStats, (
+            {"user_id": user_id, "percentage_sum": sums[user_id], "results_count": counts[user_id]}
+            for user_id in sorted(counts)
+        ))
+    timings["results_s"] = round(t.elapsed, 2)
+
+    return timings
+
+
+# ---------- Scénarios ----------
+
+async def run_scenario(client: httpx.AsyncClient, name: str, make_request) -> dict:
+    """
+    REQUESTS requêtes réparties sur CONCURRENCY clients ; make_request(rng) renvoie
+    (méthode, url, kwargs httpx). Requêtes SQL comptées par requête HTTP.
+    """
+    rng = random.Random(f"{SEED}-{name}")
+    latencies, queries, statuses = [], [], {}
+    remaining = REQUESTS
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            method, url, kwargs = make_request(rng)
+            with collect_queries() as stats:
+                with Timer() as t:
+                    try:
+                        response = await client.request(method, url, **kwargs)
+                        status = response.status_code
+                    except Exception as e:  # noqa: BLE001 - compté comme erreur, le test continue
+                        status = type(e).__name__
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(t.elapsed)
+                queries.append(stats.count)
+
+    with Timer() as wall:
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+
+    ok = len(latencies)
+    return {
+        "scenario": name,
+        "requests": REQUESTS,
+        "errors": REQUESTS - ok,
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        "throughput_rps": round(ok / wall.elapsed, 1) if wall.elapsed else 0.0,
+        **summarize(latencies),
+        "queries_per_request": round(sum(queries) / ok, 2) if ok else 0.0,
+        "max_queries": max(queries, default=0),
+    }
+
+
+async def run_scenarios() -> list[dict]:
+    students, quizzes, courses = VOLUMES["students"], VOLUMES["quizzes"], VOLUMES["courses"]
+    traffic = random.Random(SEED)
+    active = traffic.sample(range(1, students + 1), min(ACTIVE_USERS, students))
+    tokens = {}
+
+    def login(rng):
+        student = rng.choice(active)
+        return "POST", "/auth/login", {"data": {"username": student_email(student), "password": "pw"}}
+
+    def auth_header(rng):
+        student = rng.choice(active)
+        token = tokens.get(student) or create_access_token(data={"sub": student_email(student)})
+        return {"Authorization": f"Bearer {token}"}
+
+    def submission(quiz_id: int, rng) -> dict:
+        return {"answers": [
+            {"question_id": question_id(quiz_id, j),
+             "option_id": correct_option_id(question_id(quiz_id, j)) + rng.randint(0, OPTIONS_PER_QUESTION - 1)}
+            for j in range(QUESTIONS_PER_QUIZ)
+        ]}
+
+    def quiz_submit(rng):
+        quiz_id = rng.randint(1, quizzes)
+        return "POST", f"/quizzes/{quiz_id}/submit", {"headers": auth_header(rng), "json": submission(quiz_id, rng)}
+
+    scenarios = [
+        ("login", login),
+        ("auth_me", lambda rng: ("GET", "/auth/me", {"headers": auth_header(rng)})),
+        ("course_list", lambda rng: ("GET", "/courses/", {})),
+        ("quiz_fetch", lambda rng: ("GET", f"/quizzes/{rng.randint(1, quizzes)}", {"headers": auth_header(rng)})),
+        ("quiz_submit", quiz_submit),
+        ("pdf_open", lambda rng: ("GET", f"/pdfs/{rng.randint(1, courses)}/open", {"headers": auth_header(rng)})),
+        ("chatbot", lambda rng: ("POST", "/chatbot/chat", {
+            "json": {"question": f"Explique la notion numéro {rng.randint(1, CHAT_QUESTIONS)} du cours"},
+        })),
+    ]
+
+    chat_ai.llm = StubLLM()
+    for cache in caches.values():
+        cache.clear()
+
+    rows = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                 timeout=120) as client:
+        # Tokens des étudiants actifs (réutilisés par les scénarios authentifiés)
+        for student in active:
+            response = await client.post("/auth/login", data={"username": student_email(student), "password": "pw"})
+            tokens[student] = response.json()["access_token"]
+
+        for name, make_request in scenarios:
+            rows.append(await run_scenario(client, name, make_request))
+    return rows
+
+
+# ---------- Rapports ----------
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_report(report: dict) -> str:
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    path = os.path.join(REPORT_DIR, f"loadtest_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    return path
+
+
+def compare(before_path: str, after_path: str):
+    """Écarts par scénario entre deux rapports (après - avant)."""
+    with open(before_path, encoding="utf-8") as f:
+        before = {row["scenario"]: row for row in json.load(f)["results"]}
+    with open(after_path, encoding="utf-8") as f:
+        after = {row["scenario"]: row for row in json.load(f)["results"]}
+
+    rows = []
+    for name, new in after.items():
+        old = before.get(name)
+        if old is None:
+            continue
+        row = {"scenario": name}
+        for field in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "queries_per_request", "errors"):
+            row[field] = {"before": old[field], "after": new[field], "delta": round(new[field] - old[field], 3)}
+            if old[field]:
+                row[field]["change_pct"] = round((new[field] - old[field]) / old[field] * 100, 1)
+        rows.append(row)
+    print_report("loadtest_compare", rows)
+
+
+async def main(skip_seed: bool):
+    seed_timings = None if skip_seed else await seed()
+    results = await run_scenarios()
+    await engine.dispose()
+
+    report = {
+        "benchmark": "loadtest",
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "database": BENCH_DATABASE_URL,
+        "volumes": VOLUMES,
+        "seed": SEED,
+        "seed_timings": seed_timings,
+        "requests_per_scenario": REQUESTS,
+        "concurrency": CONCURRENCY,
+        "llm_seconds": LLM_SECONDS,
+        "results": results,
+    }
+    path = save_report(report)
+    print_report("loadtest", results)
+    print(f"✅ Report saved to {path}")
+    sys.exit(1 if any(row["errors"] for row in results) else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API load test")
+    parser.add_argument("command", nargs="?", choices=["run", "compare"], default="run")
+    parser.add_argument("reports", nargs="*", help="compare: two report files (before, after)")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the already seeded database")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        if len(args.reports) != 2:
+            parser.error("compare needs two report files")
+        compare(*args.reports)
+    else:
+        asyncio.run(main(args.skip_seed))
@@ -0,0 +1,40 @@
+import argparse
+import asyncio
+from app.db.database import engine
+from app.db.migrations import MIGRATIONS, current_version, head_version, migrate
+
+# Migrations du schéma : à lancer avant de (re)démarrer l'API après une mise à jour
+#   python migrate.py            applique les migrations en attente
+#   python migrate.py --to 4     s'arrête à la version 4
+#   python migrate.py status     affiche la version courante et les migrations en attente
+
+
+async def status():
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+    print(f"Schema version {version} (head {head_version()})")
+    for step in MIGRATIONS:
+        mark = "✅" if step.version <= version else "⏳"
+        print(f"{mark} {step.version:04d} {step.name}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    parser.add_argument("command", nargs="?", choices=["upgrade", "status"], default="upgrade")
+    parser.add_argument("--to", type=int, default=None, help="target version (default: latest)")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "status":
+            await status()
+            return
+
+        applied = await migrate(target=args.to)
+        for step in applied:
+            print(f"✅ {step.version:04d} {step.name}")
+        print(f"✅ Schema up to date (version {args.to or head_version()})")
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+import argparse
+import asyncio
+from app.data.pdfs.pdfs import UNPROCESSED, reprocess_pdfs, shutdown_executor
+from app.models.pdf import PDFStatusEnum
+
+# Importer tous les modèles ici pour les enregistrer
+from app.models.user import User
+from app.models.course import Course
+from app.models.enrollment import Enrollment
+from app.models.quiz import Quiz
+
+# Extraction + indexation des PDF jamais traités ou interrompus (workers redémarrés)
+#   python reprocess_pdfs.py            PDF « pending » et « processing »
+#   python reprocess_pdfs.py --failed   inclut aussi les PDF en échec
+# À lancer quand aucun worker n'est en train de traiter un envoi (« processing » est repris).
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Reprocess pending / interrupted PDFs")
+    parser.add_argument("--failed", action="store_true", help="also retry failed PDFs")
+    args = parser.parse_args()
+
+    statuses = (*UNPROCESSED, PDFStatusEnum.failed) if args.failed else UNPROCESSED
+    try:
+        count = await reprocess_pdfs(statuses)
+    finally:
+        shutdown_executor()
+    print(f"✅ {count} PDF(s) processed")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,8 @@
+from app.chatbot.chat_ai import chat_with_user
+
+# Essai manuel du chatbot pédagogique (nécessite Ollama) : python test.py
 if __name__ == "__main__":
-    user_name = "Chirine"
+    user_level = "beginner"
     user_message = "Explique les réseaux neuronaux à un débutant."
-    response = chat_with_user(user_name, user_message)
+    response = chat_with_user(user_level, user_message)
     print(response)